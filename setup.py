@@ -16,6 +16,7 @@ setup(
         "python-dotenv>=1.0.0",
         "tqdm>=4.65.0",
         "scikit-learn>=1.0.0",
+        "rapidfuzz>=3.0.0",
     ],
     extras_require={
         "dev": [
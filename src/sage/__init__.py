@@ -1,24 +1,33 @@
+import asyncio
+import atexit
 import logging
-from typing import Optional, Dict, Any
-import yaml
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
-import random
 
-from .core.models import SAGEConfig, SubPrompt, AggregatedResponse
+from .core.models import SAGEConfig, SubPrompt, ModelAssignment, ExecutionResult, EvaluationResult, AggregatedResponse
 from .agents.decomposer import DecomposerAgent
 from .agents.router import RouterAgent
 from .agents.executor import ExecutionManager
 from .agents.evaluator import Evaluator
 from .agents.aggregator import Aggregator
+from .core.utils import configure_http_session, load_yaml, CallCancelled
 
-# Setup file logger
+# Setup file logger; records are written by a background listener so logging never blocks callers on disk I/O
 logger = logging.getLogger("SAGEProtocol")
 logger.setLevel(logging.INFO)
-file_handler = logging.FileHandler("sage_protocol.log")
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
 if not logger.hasHandlers():
-    logger.addHandler(file_handler)
+    file_handler = logging.FileHandler("sage_protocol.log", delay=True)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler.setFormatter(formatter)
+    _log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(_log_queue))
+    _log_listener = QueueListener(_log_queue, file_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
 
 class SAGE:
     def __init__(self, config_path: Optional[str] = None, config_obj: Optional[SAGEConfig] = None):
@@ -32,6 +41,8 @@ class SAGE:
             self.config = config_obj
         else:
             self.config = self._load_config(config_path)
+        # Grow the shared HTTP connection pool if more LLM calls may be in flight than it holds
+        configure_http_session(self.config.max_concurrency + self.config.max_parallel_retries)
         self.decomposer = DecomposerAgent(self.config)
         self.router = RouterAgent(self.config)
         self.executor = ExecutionManager(self.config)
@@ -43,10 +54,7 @@ class SAGE:
         if config_path is None:
             config_path = Path(__file__).parent.parent.parent / "config" / "settings.yaml"
         
-        with open(config_path, "r") as f:
-            config_dict = yaml.safe_load(f)
-        
-        return SAGEConfig(**config_dict)
+        return SAGEConfig(**load_yaml(config_path))
 
     def process_prompt(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> AggregatedResponse:
         """Process a user prompt through the SAGE workflow.
@@ -58,99 +66,199 @@ class SAGE:
         Returns:
             AggregatedResponse containing the final result and execution details
         """
-        print(f"\n[INFO] Processing prompt: {prompt}\n")
-        logger.info(f"Processing prompt: {prompt}")
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aprocess_prompt(prompt, context))
+        # Called from inside a running event loop (Jupyter, async hosts): run on a helper thread with its own loop
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.aprocess_prompt(prompt, context)).result()
+
+    async def aprocess_prompt(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> AggregatedResponse:
+        """Async variant of :meth:`process_prompt`.
+        
+        Sub-prompts are executed level by level over the dependency DAG built from
+        ``SubPrompt.dependencies``; all sub-prompts within a level run concurrently,
+        bounded by ``config.max_concurrency``. The built-in decomposer chains each step
+        on the previous one, so its output still forms one sub-prompt per level.
+        """
+        verbose = self.config.verbose
+        if verbose:
+            print(f"\n[INFO] Processing prompt: {prompt}\n")
+        logger.info("Processing prompt: %s", prompt)
         # 1. Decompose the prompt
         subprompts = self.decomposer.decompose(prompt, context)
-        print(f"[INFO] Decomposed into {len(subprompts)} sub-prompts:")
-        for i, sp in enumerate(subprompts):
-            print(f"  SubPrompt {i+1}: {sp.content} (type: {sp.task_type})")
-        logger.info(f"Decomposed into {len(subprompts)} subprompts.")
+        if verbose:
+            print(f"[INFO] Decomposed into {len(subprompts)} sub-prompts:")
+            for i, sp in enumerate(subprompts):
+                print(f"  SubPrompt {i+1}: {sp.content} (type: {sp.task_type})")
+        logger.info("Decomposed into %d subprompts.", len(subprompts))
         
-        # 2. Route each subprompt to appropriate model (meta-router only once, fallback to gemma3:4b)
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        retry_semaphore = asyncio.Semaphore(self.config.max_parallel_retries)
+        
+        # 2. Route all subprompts concurrently (meta-router only once), then fall back per failed decision
+        routed = await self.router.route_batch(subprompts, return_exceptions=True)
         assignments = []
-        for i, subprompt in enumerate(subprompts):
-            print(f"\n[INFO] Assigning model for SubPrompt {i+1}: {subprompt.content}")
-            print(f"[INFO] Expected answer for SubPrompt {i+1}: {subprompt.expected_goal}")
-            logger.info(f"Expected answer for SubPrompt {i+1}: {subprompt.expected_goal}")
-            try:
-                assignment = self.router.route(subprompt)
-                if assignment.model_name not in self.config.available_models:
-                    fallback_model = self.config.available_models[0] if self.config.available_models else None
-                    print(f"[WARN] Meta-router failed, assigning '{fallback_model}' to SubPrompt {i+1}")
-                    assignment = assignment.copy(update={
-                        'model_name': fallback_model,
-                        'model_provider': self.router._get_provider(fallback_model),
-                        'parameters': self.config.model_parameters.get(fallback_model, {})
-                    })
-            except Exception as e:
+        for i, (subprompt, assignment) in enumerate(zip(subprompts, routed)):
+            if verbose:
+                print(f"\n[INFO] Assigning model for SubPrompt {i+1}: {subprompt.content}")
+                print(f"[INFO] Expected answer for SubPrompt {i+1}: {subprompt.expected_goal}")
+            logger.info("Expected answer for SubPrompt %d: %s", i + 1, subprompt.expected_goal)
+            if isinstance(assignment, Exception):
                 fallback_model = self.config.available_models[0] if self.config.available_models else None
-                print(f"[WARN] Meta-router exception: {e}. Assigning '{fallback_model}' to SubPrompt {i+1}")
-                assignment = assignment.copy(update={
-                    'model_name': fallback_model,
-                    'model_provider': self.router._get_provider(fallback_model),
-                    'parameters': self.config.model_parameters.get(fallback_model, {})
-                })
-            print(f"[INFO] Assigned model: {assignment.model_name}")
+                if verbose:
+                    print(f"[WARN] Meta-router exception: {assignment}. Assigning '{fallback_model}' to SubPrompt {i+1}")
+                assignment = self.router.make_assignment(fallback_model)
+            elif assignment.model_name not in self.config.available_models:
+                fallback_model = self.config.available_models[0] if self.config.available_models else None
+                if verbose:
+                    print(f"[WARN] Meta-router failed, assigning '{fallback_model}' to SubPrompt {i+1}")
+                assignment = self.router.make_assignment(fallback_model)
+            if verbose:
+                print(f"[INFO] Assigned model: {assignment.model_name}")
             assignments.append(assignment)
-        logger.info(f"Initial model assignments: {[a.model_name for a in assignments]}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Initial model assignments: %s", [a.model_name for a in assignments])
         
-        # 3. Execute subprompts and evaluate results
-        execution_results = []
-        previous_output = None
-        for idx, (subprompt, assignment) in enumerate(zip(subprompts, assignments)):
-            if previous_output:
-                # Chain previous output as context
-                if subprompt.context is None:
-                    subprompt.context = {}
-                subprompt.context["previous_output"] = previous_output
-            tried_models = set()
-            retry_count = 0
-            attempts = []  # Track all attempts for this sub-prompt
-            result = self.executor.execute(subprompt, assignment)
-            tried_models.add(assignment.model_name)
-            evaluation = self.evaluator.evaluate(result, subprompt)
-            attempts.append((result, evaluation))
-            print(f"[INFO] SubPrompt {idx+1} | Attempt 1 | Model: {assignment.model_name} | Similarity: {evaluation.similarity_score:.2f} | Success: {evaluation.success}")
-            print(f"[INFO] Model Output: {result.content[:200]}{'...' if len(result.content) > 200 else ''}")
-            logger.info(f"[SubPrompt {subprompt.id}] Attempt 1 - Model: {assignment.model_name} - Similarity: {evaluation.similarity_score:.2f} - Success: {evaluation.success}")
-            # Only allow retries with random fallback if initial model fails
-            while not evaluation.success and retry_count < self.config.max_retries:
-                available_models = [m for m in self.config.available_models if m not in tried_models]
-                if not available_models:
-                    logger.warning(f"[SubPrompt {subprompt.id}] All models tried. Skipping further retries.")
-                    break
-                model_name = random.choice(available_models)
-                model_params = self.config.model_parameters.get(model_name, {})
-                new_assignment = assignment.copy(update={
-                    'model_name': model_name,
-                    'model_provider': self.router._get_provider(model_name),
-                    'parameters': model_params
-                })
-                result = self.executor.execute(subprompt, new_assignment)
-                tried_models.add(new_assignment.model_name)
-                evaluation = self.evaluator.evaluate(result, subprompt)
-                attempts.append((result, evaluation))
-                retry_count += 1
-                print(f"[INFO] SubPrompt {idx+1} | Attempt {retry_count+1} | Model: {model_name} | Similarity: {evaluation.similarity_score:.2f} | Success: {evaluation.success}")
-                print(f"[INFO] Model Output: {result.content[:200]}{'...' if len(result.content) > 200 else ''}")
-                logger.info(f"[SubPrompt {subprompt.id}] Attempt {retry_count+1} - Model: {model_name} - Similarity: {evaluation.similarity_score:.2f} - Success: {evaluation.success}")
-            # Find all successful attempts
-            successful_attempts = [a for a in attempts if a[1].success]
-            if successful_attempts:
-                # Pick the best successful attempt
-                best_result, best_eval = max(successful_attempts, key=lambda x: x[1].similarity_score)
-                previous_output = best_result.content
-                # No warning/error needed
-            else:
-                # No successful attempts, pick the best overall
-                best_result, best_eval = max(attempts, key=lambda x: x[1].similarity_score)
-                previous_output = best_result.content
-                print(f"[WARN] SubPrompt {idx+1} did not meet the similarity threshold. Returning best attempt.")
-                logger.error(f"[SubPrompt {subprompt.id}] All attempts below threshold. Returning best attempt with similarity {best_eval.similarity_score:.2f}")
-            execution_results.append(best_result)
+        # 3. Execute subprompts and evaluate results, fanning out over each dependency level
+        positions = {sp.id: i for i, sp in enumerate(subprompts)}
+        outputs: Dict[str, str] = {}
+        results: Dict[str, ExecutionResult] = {}
+        for level in self._dependency_levels(subprompts):
+            level_results = await asyncio.gather(*[
+                self._run_one(positions[sp.id], sp, assignments[positions[sp.id]], outputs, semaphore, retry_semaphore)
+                for sp in level
+            ])
+            for subprompt, result in zip(level, level_results):
+                outputs[subprompt.id] = result.content
+                results[subprompt.id] = result
+        execution_results = [results[sp.id] for sp in subprompts]
         # 4. Aggregate results
         logger.info("Aggregating results.")
         agg = self.aggregator.aggregate(execution_results)
-        logger.info(f"Final aggregated response: {agg.final_response}")
-        return agg 
\ No newline at end of file
+        logger.info("Final aggregated response: %s", agg.final_response)
+        return agg
+
+    @staticmethod
+    def _dependency_levels(subprompts: List[SubPrompt]) -> List[List[SubPrompt]]:
+        """Group subprompts into levels whose dependencies are all satisfied by earlier levels.
+
+        Dependencies on ids outside of ``subprompts`` are treated as already satisfied.
+        """
+        known = {sp.id for sp in subprompts}
+        done = set()
+        remaining = list(subprompts)
+        levels = []
+        while remaining:
+            level = [sp for sp in remaining if all(d in done or d not in known for d in sp.dependencies)]
+            if not level:
+                raise ValueError(f"Cyclic sub-prompt dependencies: {[sp.id for sp in remaining]}")
+            levels.append(level)
+            done.update(sp.id for sp in level)
+            remaining = [sp for sp in remaining if sp.id not in done]
+        return levels
+
+    async def _execute_and_evaluate(self, subprompt: SubPrompt, assignment: ModelAssignment, semaphore: asyncio.Semaphore,
+                                    cancel: Optional[threading.Event] = None) -> Tuple[ExecutionResult, EvaluationResult]:
+        """Execute and evaluate a single attempt on a worker thread, holding a concurrency slot for both LLM calls.
+
+        If the awaiting task is cancelled, ``cancel`` is set so the in-flight LLM call stops, and the slot
+        is only released once the worker thread has actually returned.
+        """
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, self._execute_and_evaluate_blocking, subprompt, assignment, cancel)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if cancel is not None:
+                    cancel.set()
+                await asyncio.wait([future])
+                if not future.cancelled():
+                    future.exception()  # Retrieved so a CallCancelled from the worker isn't reported as unhandled
+                raise
+
+    def _execute_and_evaluate_blocking(self, subprompt: SubPrompt, assignment: ModelAssignment,
+                                       cancel: Optional[threading.Event]) -> Tuple[ExecutionResult, EvaluationResult]:
+        result = self.executor.execute(subprompt, assignment, cancel)
+        if cancel is not None and cancel.is_set():
+            raise CallCancelled(f"Attempt with {assignment.model_name} cancelled before evaluation")
+        return result, self.evaluator.evaluate(result, subprompt, cancel)
+
+    async def _retry_attempt(self, subprompt: SubPrompt, assignment: ModelAssignment, semaphore: asyncio.Semaphore,
+                             retry_semaphore: asyncio.Semaphore, cancel: threading.Event) -> Tuple[ExecutionResult, EvaluationResult]:
+        """Run a speculative retry attempt, bounded by ``config.max_parallel_retries`` across the run."""
+        async with retry_semaphore:
+            return await self._execute_and_evaluate(subprompt, assignment, semaphore, cancel)
+
+    def _report_attempt(self, idx: int, subprompt: SubPrompt, attempt: int, model_name: str,
+                        result: ExecutionResult, evaluation: EvaluationResult) -> None:
+        """Print (when verbose) and log the outcome of one execution attempt."""
+        if self.config.verbose:
+            print(f"[INFO] SubPrompt {idx+1} | Attempt {attempt} | Model: {model_name} | Similarity: {evaluation.similarity_score:.2f} | Success: {evaluation.success}")
+            print(f"[INFO] Model Output: {result.content[:200]}{'...' if len(result.content) > 200 else ''}")
+        logger.info("[SubPrompt %s] Attempt %d - Model: %s - Similarity: %.2f - Success: %s",
+                    subprompt.id, attempt, model_name, evaluation.similarity_score, evaluation.success)
+
+    async def _run_one(self, idx: int, subprompt: SubPrompt, assignment: ModelAssignment, outputs: Dict[str, str],
+                       semaphore: asyncio.Semaphore, retry_semaphore: asyncio.Semaphore) -> ExecutionResult:
+        """Execute, evaluate and retry one subprompt, returning its best result."""
+        # Chain the outputs of the subprompts this one depends on as context
+        previous_outputs = [outputs[d] for d in subprompt.dependencies if outputs.get(d)]
+        if previous_outputs:
+            if subprompt.context is None:
+                subprompt.context = {}
+            subprompt.context["previous_output"] = "\n\n".join(previous_outputs)
+        tried_models = set()
+        retry_count = 0
+        attempts = []  # Track all attempts for this sub-prompt
+        result, evaluation = await self._execute_and_evaluate(subprompt, assignment, semaphore)
+        tried_models.add(assignment.model_name)
+        attempts.append((result, evaluation))
+        self.router.record_outcome(subprompt, assignment, evaluation)
+        self._report_attempt(idx, subprompt, 1, assignment.model_name, result, evaluation)
+        # Only allow retries if initial model fails. Each round dispatches the untried models with the
+        # best success record on this task type speculatively and keeps the first successful answer.
+        while not evaluation.success and retry_count < self.config.max_retries:
+            available_models = [m for m in self.config.available_models if m not in tried_models]
+            if not available_models:
+                logger.warning("[SubPrompt %s] All models tried. Skipping further retries.", subprompt.id)
+                break
+            width = min(self.config.max_parallel_retries, self.config.max_retries - retry_count, len(available_models))
+            candidates = self.router.rank_models(subprompt.task_type, available_models)[:max(width, 1)]
+            tried_models.update(candidates)
+            cancel = threading.Event()
+            tasks = [
+                asyncio.ensure_future(self._retry_attempt(subprompt, self.router.make_assignment(m), semaphore, retry_semaphore, cancel))
+                for m in candidates
+            ]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    result, evaluation = await future
+                    attempts.append((result, evaluation))
+                    self.router.record_outcome(subprompt, result.model_used, evaluation)
+                    retry_count += 1
+                    self._report_attempt(idx, subprompt, retry_count + 1, result.model_used.model_name, result, evaluation)
+                    if evaluation.success:
+                        break
+            finally:
+                # Stop the slower speculative attempts once one has succeeded; their in-flight Ollama
+                # streams are closed, and each keeps its concurrency slot until its thread has returned
+                cancel.set()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        # Find all successful attempts
+        successful_attempts = [a for a in attempts if a[1].success]
+        if successful_attempts:
+            # Pick the best successful attempt
+            best_result, best_eval = max(successful_attempts, key=lambda x: x[1].similarity_score)
+        else:
+            # No successful attempts, pick the best overall
+            best_result, best_eval = max(attempts, key=lambda x: x[1].similarity_score)
+            if self.config.verbose:
+                print(f"[WARN] SubPrompt {idx+1} did not meet the similarity threshold. Returning best attempt.")
+            logger.error("[SubPrompt %s] All attempts below threshold. Returning best attempt with similarity %.2f",
+                         subprompt.id, best_eval.similarity_score)
+        return best_result
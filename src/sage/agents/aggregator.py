@@ -1,9 +1,15 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+import operator
 import time
 
+import numpy as np
+
 from .base import BaseAgent
 from ..core.models import ExecutionResult, AggregatedResponse
 
+# Below this many results the plain Python pass is cheaper than building numpy arrays
+_VECTORIZE_MIN_RESULTS = 256
+
 class Aggregator(BaseAgent):
     """Agent responsible for aggregating execution results into a final response."""
     
@@ -19,29 +25,25 @@ class Aggregator(BaseAgent):
         self._log_info("Starting result aggregation",
                       num_results=len(results))
         
-        # Sort results by execution time to maintain order
-        sorted_results = sorted(results, key=lambda r: r.metadata.get("execution_time", 0))
-        
-        # Combine all successful results
-        successful_results = [r for r in sorted_results if r.success]
-        final_response = "\n\n".join(r.content for r in successful_results)
-        
-        # Calculate metadata
-        total_execution_time = sum(
-            r.metadata.get("execution_time", 0) 
-            for r in successful_results
-        )
+        if len(results) >= _VECTORIZE_MIN_RESULTS:
+            parts, total_execution_time = self._combine_vectorized(results)
+        else:
+            parts, total_execution_time = self._combine(results)
+        # str.join sizes the result up front and copies each part once; a reusable bytearray
+        # buffer would add an encode and a decode copy per call without saving an allocation
+        final_response = "\n\n".join(parts)
+        num_successful = len(parts)
         
-        success_rate = len(successful_results) / len(results) if results else 0
+        success_rate = num_successful / len(results) if results else 0
         
-        aggregated = AggregatedResponse(
+        aggregated = AggregatedResponse.fast(
             final_response=final_response,
             execution_results=results,
             metadata={
                 "total_execution_time": total_execution_time,
                 "success_rate": success_rate,
                 "num_results": len(results),
-                "num_successful": len(successful_results),
+                "num_successful": num_successful,
                 "aggregation_time": time.time()
             }
         )
@@ -52,6 +54,35 @@ class Aggregator(BaseAgent):
         
         return aggregated
     
+    def _combine(self, results: List[ExecutionResult]) -> Tuple[List[str], float]:
+        """Return successful contents in output order and their total execution time."""
+        # Results arrive in sub-prompt (submission) order; only reorder by execution time when configured
+        timed = [(r.metadata.get("execution_time", 0), r) for r in results]
+        if self.config.aggregator_order == "exec_time":
+            timed.sort(key=operator.itemgetter(0))
+        
+        # Collect successful contents and total their execution time in one pass
+        parts = []
+        total_execution_time = 0.0
+        for execution_time, r in timed:
+            if r.success:
+                parts.append(r.content)
+                total_execution_time += execution_time
+        return parts, total_execution_time
+    
+    def _combine_vectorized(self, results: List[ExecutionResult]) -> Tuple[List[str], float]:
+        """Same as :meth:`_combine`, using numpy arrays of the per-result scalars for large result lists."""
+        count = len(results)
+        success = np.fromiter((r.success for r in results), dtype=bool, count=count)
+        times = np.fromiter((r.metadata.get("execution_time", 0.0) for r in results), dtype=np.float64, count=count)
+        if self.config.aggregator_order == "exec_time":
+            order = np.argsort(times, kind="stable")
+            selected = order[success[order]]
+        else:
+            selected = np.flatnonzero(success)
+        parts = [results[i].content for i in selected]
+        return parts, float(times[selected].sum())
+    
     def aggregate(self, results: List[ExecutionResult]) -> AggregatedResponse:
         """Alias for process method to maintain consistent interface."""
         return self.process(results) 
\ No newline at end of file
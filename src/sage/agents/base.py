@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
+import asyncio
+import functools
 import logging
 
 from ..core.models import SAGEConfig
@@ -24,21 +26,35 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def aprocess(self, *args, **kwargs) -> Any:
+        """Run :meth:`process` on the event loop's default executor.
+        
+        Agent work is dominated by blocking LLM HTTP calls, so running it off the
+        loop lets independent calls overlap.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.process, *args, **kwargs))
+    
     def _log_info(self, message: str, **kwargs):
         """Log an info message with additional context."""
-        self.logger.info(f"{message} | Context: {kwargs}")
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("%s | Context: %s", message, kwargs)
     
     def _log_error(self, message: str, error: Optional[Exception] = None, **kwargs):
         """Log an error message with additional context and exception."""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         if error:
-            self.logger.error(f"{message} | Error: {str(error)} | Context: {kwargs}")
+            self.logger.error("%s | Error: %s | Context: %s", message, error, kwargs)
         else:
-            self.logger.error(f"{message} | Context: {kwargs}")
+            self.logger.error("%s | Context: %s", message, kwargs)
     
     def _log_warning(self, message: str, **kwargs):
         """Log a warning message with additional context."""
-        self.logger.warning(f"{message} | Context: {kwargs}")
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning("%s | Context: %s", message, kwargs)
     
     def _log_debug(self, message: str, **kwargs):
         """Log a debug message with additional context."""
-        self.logger.debug(f"{message} | Context: {kwargs}") 
\ No newline at end of file
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s | Context: %s", message, kwargs)
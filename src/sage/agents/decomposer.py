@@ -5,6 +5,34 @@ import re
 from .base import BaseAgent
 from ..core.models import SubPrompt, TaskType
 
+_STEP_SPLIT_RE = re.compile(r'\d+\. ')
+
+# (keywords, task type, expected goal); earlier rules win when a step matches several
+_TASK_RULES = [
+    (("analyz",), TaskType.ANALYSIS, "Identify and explain main challenges"),
+    (("propos", "solution"), TaskType.TECHNICAL, "Propose a technical solution with sensors, data infrastructure, and AI models"),
+    (("summary", "persuasive"), TaskType.CREATIVE, "Write a persuasive summary for city officials"),
+    (("identify",), TaskType.ANALYSIS, "Identification of main ethical and operational challenges."),
+    (("suggest",), TaskType.TECHNICAL, "Suggest a technical architecture, including data sources, model types, and privacy safeguards."),
+    (("draft", "plan"), TaskType.CREATIVE, "Draft a communication plan to explain the system to patients and staff, addressing concerns and highlighting benefits."),
+    (("explain",), TaskType.CREATIVE, "Provide a clear explanation as requested."),
+    (("list",), TaskType.OTHER, "List the required items or points."),
+]
+_KEYWORD_RULE = {keyword: i for i, (keywords, _, _) in enumerate(_TASK_RULES) for keyword in keywords}
+# Zero-width lookahead so overlapping keywords (e.g. "plan" in "planalyze") are all seen, as with substring checks
+_TASK_KEYWORDS_RE = re.compile("(?=(" + "|".join(_KEYWORD_RULE) + "))", re.IGNORECASE)
+
+def _match_rule(step: str) -> Optional[int]:
+    """Return the index of the highest-priority rule whose keyword occurs in ``step``, in one scan."""
+    best = None
+    for match in _TASK_KEYWORDS_RE.finditer(step):
+        rule = _KEYWORD_RULE[match.group(1).lower()]
+        if best is None or rule < best:
+            best = rule
+            if best == 0:
+                break
+    return best
+
 class DecomposerAgent(BaseAgent):
     """Agent responsible for breaking down user prompts into sub-tasks."""
     
@@ -20,41 +48,19 @@ class DecomposerAgent(BaseAgent):
         """
         self._log_info("Starting prompt decomposition", prompt=prompt)
         # Rule-based split for numbered steps
-        steps = re.split(r'\d+\. ', prompt)
+        steps = _STEP_SPLIT_RE.split(prompt)
         steps = [s.strip() for s in steps if s.strip()]
         subprompts = []
         for i, step in enumerate(steps):
-            # Heuristic: assign task type and expected goal
-            step_lower = step.lower()
-            if "analyz" in step_lower:
-                task_type = TaskType.ANALYSIS
-                expected_goal = "Identify and explain main challenges"
-            elif "propos" in step_lower or "solution" in step_lower:
-                task_type = TaskType.TECHNICAL
-                expected_goal = "Propose a technical solution with sensors, data infrastructure, and AI models"
-            elif "summary" in step_lower or "persuasive" in step_lower:
-                task_type = TaskType.CREATIVE
-                expected_goal = "Write a persuasive summary for city officials"
-            elif "identify" in step_lower:
-                task_type = TaskType.ANALYSIS
-                expected_goal = "Identification of main ethical and operational challenges."
-            elif "suggest" in step_lower:
-                task_type = TaskType.TECHNICAL
-                expected_goal = "Suggest a technical architecture, including data sources, model types, and privacy safeguards."
-            elif "draft" in step_lower or "plan" in step_lower:
-                task_type = TaskType.CREATIVE
-                expected_goal = "Draft a communication plan to explain the system to patients and staff, addressing concerns and highlighting benefits."
-            elif "explain" in step_lower:
-                task_type = TaskType.CREATIVE
-                expected_goal = "Provide a clear explanation as requested."
-            elif "list" in step_lower:
-                task_type = TaskType.OTHER
-                expected_goal = "List the required items or points."
+            # Heuristic: assign task type and expected goal from the highest-priority keyword
+            rule = _match_rule(step)
+            if rule is not None:
+                _, task_type, expected_goal = _TASK_RULES[rule]
             else:
                 task_type = TaskType.OTHER
                 expected_goal = "Complete the sub-task"
             subprompts.append(
-                SubPrompt(
+                SubPrompt.fast(
                     id=str(uuid.uuid4()),
                     content=step,
                     task_type=task_type,
@@ -1,9 +1,14 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from .base import BaseAgent
 from ..core.models import SubPrompt, ExecutionResult, EvaluationResult
-from ..core.utils import call_ollama
-import difflib
-from sentence_transformers import SentenceTransformer, util
+from ..core.utils import call_ollama, get_embedding_model, embed_text, CallCancelled
+from ..core.cache import LLMCache
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from rapidfuzz import fuzz
 
 LLM_EVAL_PROMPT = """
 You are an expert evaluator. Given a sub-task and a model's answer, determine if the answer correctly and sufficiently fulfills the sub-task. 
@@ -19,73 +24,214 @@ YES (0.95): The answer is correct and complete.
 NO (0.2): The answer is missing key details.
 """
 
+# Subprompt texts whose embeddings are kept for reuse by the similarity fallback
+_QUESTION_EMBEDDINGS_MAX = 256
+
+# A YES/NO verdict word or a 0-1 confidence number, matched in a single alternation
+_EVAL_TOKEN_RE = re.compile(r'\b(yes|no)\b|([01](?:\.\d+)?)', re.IGNORECASE)
+# Reasoning models (e.g. deepseek-r1) think aloud before answering; only the text after the block is the reply
+_THINK_BLOCK_RE = re.compile(r'<think>.*?</think>', re.IGNORECASE | re.DOTALL)
+# The verdict as the prompt asks for it: the reply's first word, ignoring leading punctuation or markdown
+_LEADING_VERDICT_RE = re.compile(r'[\W_]*(yes|no)\b', re.IGNORECASE)
+
+def _parse_eval(response: str) -> Tuple[Optional[bool], Optional[float]]:
+    """
+    Extract the verdict and confidence from an evaluator reply, ignoring any <think> block.
+    The verdict is the reply's first word when that is YES/NO; otherwise any whole-word YES in the
+    reply wins over NO. The confidence is the first 0-1 number. Either value is None if absent.
+    """
+    reply = _THINK_BLOCK_RE.sub('', response)
+    leading = _LEADING_VERDICT_RE.match(reply)
+    verdict = leading.group(1).lower() == 'yes' if leading else None
+    confidence = None
+    saw_no = False
+    for match in _EVAL_TOKEN_RE.finditer(reply):
+        word, number = match.groups()
+        if word is not None:
+            if verdict is None:
+                if word.lower() == 'yes':
+                    verdict = True
+                else:
+                    saw_no = True
+        elif confidence is None:
+            confidence = float(number)
+        if verdict is not None and confidence is not None:
+            break
+    if verdict is None and saw_no:
+        verdict = False
+    return verdict, confidence
+
 class Evaluator(BaseAgent):
     """Agent responsible for evaluating execution results against expected goals using LLM-based evaluation."""
     
-    def process(self, result: ExecutionResult, subprompt: SubPrompt) -> EvaluationResult:
+    def __init__(self, config):
+        """Initialize the evaluator and its LLM response cache."""
+        super().__init__(config)
+        # Resolve evaluation settings once instead of on every call
+        self._eval_model = getattr(config, 'evaluator_model', None) or config.model_assignments.get('evaluation', 'deepseek-r1:1.5b')
+        self._threshold = getattr(config, 'similarity_threshold', 0.9)
+        self._question_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._question_lock = threading.Lock()
+        try:
+            # Pre-warm the embedding model so the first fallback or cache lookup doesn't pay the load
+            get_embedding_model()
+        except Exception as e:
+            self._log_warning("Could not preload embedding model", error=str(e))
+        self._cache = None
+        if config.evaluator_cache:
+            self._cache = LLMCache(
+                max_size=config.cache_max_size,
+                ttl=config.cache_ttl,
+                similarity_threshold=config.cache_similarity_threshold,
+                embed=embed_text if config.evaluator_semantic_cache else None,
+                directory=config.cache_dir
+            )
+    
+    def process(self, result: ExecutionResult, subprompt: SubPrompt,
+                cancel: Optional[threading.Event] = None) -> EvaluationResult:
         self._log_info("Evaluating execution result (LLM)", subprompt_id=result.subprompt_id)
         if not result.success:
-            return EvaluationResult(
-                subprompt_id=result.subprompt_id,
-                success=False,
-                similarity_score=0.0,
-                feedback="Execution failed",
-                retry_count=0
-            )
-        # Select evaluation model dynamically
-        eval_model = getattr(self.config, 'evaluator_model', None) or self.config.model_assignments.get('evaluation', 'deepseek-r1:1.5b')
+            return self._execution_failed(result)
+        if not result.content:
+            return self._empty_answer(result)
+        evaluation = self._evaluate_llm(result, subprompt, cancel)
+        if evaluation is None:
+            # Fallback: use semantic similarity between result.content and subprompt.content
+            evaluation = self._evaluate_similarity([result], [subprompt])[0]
+        return evaluation
+    
+    def evaluate_batch(self, results: List[ExecutionResult], subprompts: List[SubPrompt]) -> List[EvaluationResult]:
+        """Evaluate several execution results at once.
+        
+        LLM verdicts are requested per result; every result whose LLM evaluation fails is then
+        scored by the similarity fallback in a single batched embedding pass.
+        
+        Args:
+            results: Execution results to evaluate
+            subprompts: The subprompt each result answers, in the same order
+            
+        Returns:
+            One EvaluationResult per result, in input order
+        """
+        self._log_info("Evaluating execution results (LLM batch)", num_results=len(results))
+        evaluations = [self._evaluate_one_llm(result, subprompt) for result, subprompt in zip(results, subprompts)]
+        return self._fill_similarity(evaluations, results, subprompts)
+    
+    async def aevaluate_many(self, results: List[ExecutionResult], subprompts: List[SubPrompt]) -> List[EvaluationResult]:
+        """Async variant of :meth:`evaluate_batch`.
+        
+        LLM verdicts are requested concurrently, at most ``config.max_concurrency`` at a time;
+        results left without a verdict are then scored in one batched similarity pass.
+        """
+        self._log_info("Evaluating execution results (LLM batch)", num_results=len(results))
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        
+        async def evaluate_one(result: ExecutionResult, subprompt: SubPrompt) -> Optional[EvaluationResult]:
+            async with semaphore:
+                return await loop.run_in_executor(None, self._evaluate_one_llm, result, subprompt)
+        
+        evaluations = await asyncio.gather(*[evaluate_one(r, sp) for r, sp in zip(results, subprompts)])
+        return await loop.run_in_executor(None, self._fill_similarity, list(evaluations), results, subprompts)
+    
+    def _evaluate_one_llm(self, result: ExecutionResult, subprompt: SubPrompt) -> Optional[EvaluationResult]:
+        """Evaluate one result without the similarity fallback, returning None if the LLM verdict failed."""
+        if not result.success:
+            return self._execution_failed(result)
+        if not result.content:
+            return self._empty_answer(result)
+        return self._evaluate_llm(result, subprompt)
+    
+    def _fill_similarity(self, evaluations: List[Optional[EvaluationResult]], results: List[ExecutionResult],
+                         subprompts: List[SubPrompt]) -> List[EvaluationResult]:
+        """Score every result still lacking an evaluation in a single batched similarity pass."""
+        pending = [i for i, evaluation in enumerate(evaluations) if evaluation is None]
+        if pending:
+            fallback = self._evaluate_similarity([results[i] for i in pending], [subprompts[i] for i in pending])
+            for i, evaluation in zip(pending, fallback):
+                evaluations[i] = evaluation
+        return evaluations
+    
+    def _recall_question_embeddings(self, questions: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached embeddings among ``questions``, marking each as recently used."""
+        known = {}
+        with self._question_lock:
+            for question in set(questions):
+                embedding = self._question_embeddings.get(question)
+                if embedding is not None:
+                    self._question_embeddings.move_to_end(question)
+                    known[question] = embedding
+        return known
+    
+    def _remember_question_embeddings(self, questions: List[str], embeddings) -> None:
+        with self._question_lock:
+            for question, embedding in zip(questions, embeddings):
+                self._question_embeddings[question] = embedding
+                self._question_embeddings.move_to_end(question)
+            while len(self._question_embeddings) > _QUESTION_EMBEDDINGS_MAX:
+                self._question_embeddings.popitem(last=False)
+    
+    def _execution_failed(self, result: ExecutionResult) -> EvaluationResult:
+        return EvaluationResult.fast(
+            subprompt_id=result.subprompt_id,
+            success=False,
+            similarity_score=0.0,
+            feedback="Execution failed",
+            retry_count=0
+        )
+    
+    def _empty_answer(self, result: ExecutionResult) -> EvaluationResult:
+        # An empty answer cannot fulfil the sub-task, so don't spend an LLM call judging it
+        return EvaluationResult.fast(
+            subprompt_id=result.subprompt_id,
+            success=False,
+            similarity_score=0.0,
+            feedback="Empty answer",
+            retry_count=0
+        )
+    
+    def _evaluate_llm(self, result: ExecutionResult, subprompt: SubPrompt,
+                      cancel: Optional[threading.Event] = None) -> Optional[EvaluationResult]:
+        """Ask the evaluator LLM for a verdict, returning None if the LLM call fails.
+        
+        CallCancelled propagates when ``cancel`` stops the call, rather than falling back to similarity.
+        """
+        eval_model = self._eval_model
         prompt = LLM_EVAL_PROMPT.format(subtask=subprompt.content, answer=result.content)
         try:
-            llm_response = call_ollama(prompt, model=eval_model)
-            # Parse LLM response
-            llm_response_lower = llm_response.lower()
-            import re
-            conf_match = re.search(r'([01](?:\.\d+)?)', llm_response)
-            similarity_score = float(conf_match.group(1)) if conf_match else 0.0
-            feedback = llm_response.strip()
-            threshold = getattr(self.config, 'similarity_threshold', 0.9)
-            if 'yes' in llm_response_lower:
-                success = True
-            elif 'no' in llm_response_lower:
-                success = False
-            elif conf_match:
-                # If confidence is high, treat as success
-                if similarity_score >= threshold:
-                    self._log_warning("LLM response ambiguous but confidence high, treating as success", subprompt_id=result.subprompt_id, confidence=similarity_score)
-                    success = True
-                else:
-                    self._log_warning("LLM response ambiguous and confidence low, treating as failure", subprompt_id=result.subprompt_id, confidence=similarity_score)
-                    success = False
+            if self._cache is not None:
+                llm_response = self._cache.get_or_set(
+                    f"{subprompt.content}||{result.content}",
+                    lambda: call_ollama(prompt, model=eval_model, cancel=cancel),
+                    namespace=eval_model
+                )
             else:
-                self._log_warning("LLM response ambiguous and no confidence found, treating as failure", subprompt_id=result.subprompt_id)
-                success = False
+                llm_response = call_ollama(prompt, model=eval_model, cancel=cancel)
+        except CallCancelled:
+            raise
         except Exception as e:
             self._log_error("LLM evaluation using Ollama failed, falling back to semantic similarity", error=e)
-            # Fallback: use semantic similarity between result.content and subprompt.content
-            answer = result.content or ""
-            question = subprompt.content or ""
-            similarity_score = 0.0
-            threshold = getattr(self.config, 'similarity_threshold', 0.9)
-            feedback = ""
-            try:
-                model = SentenceTransformer('all-MiniLM-L6-v2')
-                emb_answer = model.encode(answer, convert_to_tensor=True)
-                emb_question = model.encode(question, convert_to_tensor=True)
-                similarity_score = float(util.pytorch_cos_sim(emb_answer, emb_question).item())
-                feedback = f"Semantic similarity score: {similarity_score:.2f} (threshold: {threshold})"
-            except Exception as embed_e:
-                similarity_score = difflib.SequenceMatcher(None, answer, question).ratio() if answer and question else 0.0
-                feedback = f"Fallback string similarity score: {similarity_score:.2f} (threshold: {threshold}) (embedding error: {embed_e})"
-            success = similarity_score >= threshold
-            return EvaluationResult(
-                subprompt_id=result.subprompt_id,
-                success=success,
-                similarity_score=similarity_score,
-                feedback=feedback,
-                retry_count=0
-            )
+            return None
+        # Parse LLM response
+        verdict, confidence = _parse_eval(llm_response)
+        similarity_score = confidence if confidence is not None else 0.0
+        feedback = llm_response.strip()
+        threshold = self._threshold
+        if verdict is not None:
+            success = verdict
+        elif confidence is not None:
+            # If confidence is high, treat as success
+            if similarity_score >= threshold:
+                self._log_warning("LLM response ambiguous but confidence high, treating as success", subprompt_id=result.subprompt_id, confidence=similarity_score)
+                success = True
+            else:
+                self._log_warning("LLM response ambiguous and confidence low, treating as failure", subprompt_id=result.subprompt_id, confidence=similarity_score)
+                success = False
+        else:
+            self._log_warning("LLM response ambiguous and no confidence found, treating as failure", subprompt_id=result.subprompt_id)
+            success = False
         self._log_info("Completed evaluation (LLM)", subprompt_id=result.subprompt_id, success=success, similarity_score=similarity_score)
-        return EvaluationResult(
+        return EvaluationResult.fast(
             subprompt_id=result.subprompt_id,
             success=success,
             similarity_score=similarity_score,
@@ -93,5 +239,59 @@ class Evaluator(BaseAgent):
             retry_count=0
         )
     
-    def evaluate(self, result: ExecutionResult, subprompt: SubPrompt) -> EvaluationResult:
-        return self.process(result, subprompt) 
\ No newline at end of file
+    def _evaluate_similarity(self, results: List[ExecutionResult], subprompts: List[SubPrompt]) -> List[EvaluationResult]:
+        """Score answers against their subprompts by embedding cosine, or string similarity if embedding fails."""
+        answers = [r.content or "" for r in results]
+        questions = [sp.content or "" for sp in subprompts]
+        threshold = self._threshold
+        # Empty and verbatim pairs score 0.0 and 1.0 outright; only the rest need embedding
+        trivial = {i: (0.0 if not a or not q else 1.0) for i, (a, q) in enumerate(zip(answers, questions)) if not a or not q or a == q}
+        if trivial:
+            rest = [i for i in range(len(answers)) if i not in trivial]
+            scored = self._evaluate_similarity([results[i] for i in rest], [subprompts[i] for i in rest]) if rest else []
+            evaluations = dict(zip(rest, scored))
+            return [
+                evaluations[i] if i in evaluations else EvaluationResult.fast(
+                    subprompt_id=result.subprompt_id,
+                    success=trivial[i] >= threshold,
+                    similarity_score=trivial[i],
+                    feedback=f"Trivial similarity score: {trivial[i]:.2f} (threshold: {threshold})",
+                    retry_count=0
+                )
+                for i, result in enumerate(results)
+            ]
+        try:
+            model = get_embedding_model()
+            # Subprompt texts repeat across retries, so only embed the ones not seen before
+            known = self._recall_question_embeddings(questions)
+            missing = [q for q in dict.fromkeys(questions) if q not in known]
+            # One forward pass over every answer and new question of the batch
+            embs = model.encode(answers + missing, normalize_embeddings=True).astype(np.float32, copy=False)
+            count = len(answers)
+            known.update(zip(missing, embs[count:]))
+            self._remember_question_embeddings(missing, embs[count:])
+            # Row-wise dot products of normalized embeddings are the pairwise cosines
+            question_embs = np.stack([known[q] for q in questions])
+            scores = np.einsum("ij,ij->i", embs[:count], question_embs).tolist()
+            feedbacks = [f"Semantic similarity score: {score:.2f} (threshold: {threshold})" for score in scores]
+        except Exception as embed_e:
+            scores = [fuzz.ratio(a, q) / 100.0 if a and q else 0.0 for a, q in zip(answers, questions)]
+            feedbacks = [f"Fallback string similarity score: {score:.2f} (threshold: {threshold}) (embedding error: {embed_e})" for score in scores]
+        return [
+            EvaluationResult.fast(
+                subprompt_id=result.subprompt_id,
+                success=score >= threshold,
+                similarity_score=score,
+                feedback=feedback,
+                retry_count=0
+            )
+            for result, score, feedback in zip(results, scores, feedbacks)
+        ]
+    
+    def evaluate(self, result: ExecutionResult, subprompt: SubPrompt,
+                 cancel: Optional[threading.Event] = None) -> EvaluationResult:
+        return self.process(result, subprompt, cancel)
+    
+    async def aevaluate(self, result: ExecutionResult, subprompt: SubPrompt) -> EvaluationResult:
+        """Async variant of :meth:`evaluate`."""
+        return await self.aprocess(result, subprompt)
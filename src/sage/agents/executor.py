@@ -1,42 +1,68 @@
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import threading
 import time
 
 from .base import BaseAgent
 from ..core.models import SubPrompt, ModelAssignment, ExecutionResult
-from ..core.utils import call_ollama, call_gemini
+from ..core.utils import call_ollama, call_gemini, embed_text, CallCancelled
+from ..core.cache import LLMCache
 
 class ExecutionManager(BaseAgent):
     """Agent responsible for executing sub-tasks using assigned local Ollama models or cloud LLMs."""
     
     def __init__(self, config):
-        """Initialize the execution manager with configuration."""
+        """Initialize the execution manager and its response cache."""
         super().__init__(config)
+        self._cache = None
+        if config.executor_cache:
+            self._cache = LLMCache(
+                max_size=config.cache_max_size,
+                ttl=config.cache_ttl,
+                similarity_threshold=config.cache_similarity_threshold,
+                embed=embed_text if config.executor_semantic_cache else None,
+                directory=config.cache_dir
+            )
     
-    def process(self, subprompt: SubPrompt, assignment: ModelAssignment) -> ExecutionResult:
-        """Execute a subprompt using the assigned model (Ollama local or Gemini cloud)."""
+    def process(self, subprompt: SubPrompt, assignment: ModelAssignment,
+                cancel: Optional[threading.Event] = None) -> ExecutionResult:
+        """Execute a subprompt using the assigned model (Ollama local or Gemini cloud).
+        
+        Setting ``cancel`` stops an in-flight Ollama generation; CallCancelled is then raised.
+        """
         provider = assignment.model_provider.lower()
         self._log_info(f"Executing subprompt ({provider})", subprompt_id=subprompt.id, model=assignment.model_name)
+        started = time.perf_counter()
         try:
-            if provider == "gemini":
-                response = call_gemini(subprompt.content, model=assignment.model_name, parameters=assignment.parameters)
+            if self._cache is not None:
+                # Opt-in (executor_cache): calls sample at the provider default temperature, so a hit replays
+                # one sampled answer for the same model, parameters, task type and (near-)identical prompt
+                response = self._cache.get_or_set(
+                    subprompt.content,
+                    lambda: self._call_model(provider, subprompt, assignment, cancel),
+                    namespace=f"{provider}:{assignment.model_name}:{subprompt.task_type.value}:{sorted(assignment.parameters.items())!r}"
+                )
             else:
-                response = call_ollama(subprompt.content, model=assignment.model_name)
-            result = ExecutionResult(
+                response = self._call_model(provider, subprompt, assignment, cancel)
+            result = ExecutionResult.fast(
                 subprompt_id=subprompt.id,
                 content=response,
                 model_used=assignment,
                 success=True,
                 similarity_score=1.0,  # Will be updated by evaluator
                 metadata={
-                    "execution_time": time.time(),
+                    "execution_time": time.perf_counter() - started,
                     "provider": provider
                 }
             )
             self._log_info(f"Successfully executed subprompt ({provider})", subprompt_id=subprompt.id, model=assignment.model_name)
             return result
+        except CallCancelled:
+            self._log_info(f"Cancelled subprompt execution ({provider})", subprompt_id=subprompt.id, model=assignment.model_name)
+            raise
         except Exception as e:
             self._log_error(f"Failed to execute subprompt ({provider})", error=e, subprompt_id=subprompt.id, model=assignment.model_name)
-            return ExecutionResult(
+            return ExecutionResult.fast(
                 subprompt_id=subprompt.id,
                 content="",
                 model_used=assignment,
@@ -44,11 +70,48 @@ class ExecutionManager(BaseAgent):
                 similarity_score=0.0,
                 metadata={
                     "error": str(e),
-                    "execution_time": time.time(),
+                    "execution_time": time.perf_counter() - started,
                     "provider": provider
                 }
             )
     
-    def execute(self, subprompt: SubPrompt, assignment: ModelAssignment) -> ExecutionResult:
+    def _call_model(self, provider: str, subprompt: SubPrompt, assignment: ModelAssignment,
+                    cancel: Optional[threading.Event] = None) -> str:
+        if provider == "gemini":
+            # The Gemini SDK call can't be interrupted, so only honour a cancel that arrived before it starts
+            if cancel is not None and cancel.is_set():
+                raise CallCancelled(f"Gemini call to {assignment.model_name} cancelled")
+            return call_gemini(subprompt.content, model=assignment.model_name, parameters=assignment.parameters)
+        return call_ollama(subprompt.content, model=assignment.model_name, cancel=cancel)
+    
+    def execute(self, subprompt: SubPrompt, assignment: ModelAssignment,
+                cancel: Optional[threading.Event] = None) -> ExecutionResult:
         """Alias for process method to maintain consistent interface."""
-        return self.process(subprompt, assignment) 
\ No newline at end of file
+        return self.process(subprompt, assignment, cancel)
+    
+    async def aexecute(self, subprompt: SubPrompt, assignment: ModelAssignment) -> ExecutionResult:
+        """Async variant of :meth:`execute`."""
+        return await self.aprocess(subprompt, assignment)
+    
+    async def execute_many(self, pairs: List[Tuple[SubPrompt, ModelAssignment]],
+                           on_result: Optional[Callable[[int, ExecutionResult], None]] = None) -> List[ExecutionResult]:
+        """Execute several subprompts concurrently, at most ``config.max_concurrency`` at a time.
+        
+        Args:
+            pairs: (subprompt, assignment) pairs to execute
+            on_result: Called with (index, result) as each execution completes, in completion order. Failed
+                executions are reported too (``result.success`` is False); an execution that raises is not
+            
+        Returns:
+            One ExecutionResult (or the exception raised while executing it) per pair, in input order
+        """
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        
+        async def execute_one(index: int, subprompt: SubPrompt, assignment: ModelAssignment) -> ExecutionResult:
+            async with semaphore:
+                result = await self.aexecute(subprompt, assignment)
+            if on_result is not None:
+                on_result(index, result)
+            return result
+        
+        return await asyncio.gather(*[execute_one(i, sp, a) for i, (sp, a) in enumerate(pairs)], return_exceptions=True)
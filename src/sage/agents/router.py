@@ -1,9 +1,13 @@
-from typing import Dict, Any, Optional
-import random
+from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from collections import Counter
+import asyncio
+import re
 
 from .base import BaseAgent
 from ..core.models import SubPrompt, ModelAssignment, TaskType, EvaluationResult, ExecutionResult
 from ..core.utils import call_ollama, extract_model_name_from_response
+from ..core.cache import LLMCache
 
 META_ROUTER_PROMPT_TEMPLATE = """
 You are an expert model selector for a multi-LLM AI system.
@@ -19,13 +23,36 @@ Available models:
 Respond with only the model name that is best suited for this sub-task.
 """
 
+# The template split once around its two placeholders, so prompts are built by plain concatenation
+_PROMPT_PREFIX, _PROMPT_MID, _PROMPT_SUFFIX = re.split(r"\{(?:subtask|model_list)\}", META_ROUTER_PROMPT_TEMPLATE)
+
+def _build_router_prompt(subtask: str, model_list: str) -> str:
+    return _PROMPT_PREFIX + subtask + _PROMPT_MID + model_list + _PROMPT_SUFFIX
+
+_NO_PARAMETERS = MappingProxyType({})
+
+# Successes a model needs on a task type before reassignment trusts them over the meta-router
+_CONFIDENT_SUCCESSES = 3
+
 class RouterAgent(BaseAgent):
     """Agent responsible for routing tasks to appropriate models using a meta-router LLM."""
     
+    def __init__(self, config):
+        """Initialize the router with per-model lookups resolved once."""
+        super().__init__(config)
+        self._provider_cache: Dict[str, str] = {m: self._classify_provider(m) for m in config.available_models}
+        self._model_parameters = {m: MappingProxyType(p) for m, p in config.model_parameters.items()}
+        self._available_models = tuple(config.available_models)
+        self._model_list_block = self._format_model_list(self._available_models)
+        # Meta-router replies by prompt, so repeated sub-tasks skip the LLM round-trip
+        self._route_cache = LLMCache(max_size=config.cache_max_size, ttl=config.cache_ttl)
+        # (task_type, model) -> successful attempts seen in this run
+        self._success_counts: Counter = Counter()
+    
     def process(self, subprompt: SubPrompt) -> ModelAssignment:
         """Process a subprompt and determine the best model to handle it using the meta-router LLM or direct assignment if only cloud models are available."""
         self._log_info("Routing subprompt (meta-router)", subprompt_id=subprompt.id, task_type=subprompt.task_type)
-        available_models = self.config.available_models
+        available_models = self._available_models
         provider_map = getattr(self.config, 'model_provider_map', {})
         # If all available models are cloud, skip meta-router
         only_cloud = all(provider_map.get(m, 'local') == 'cloud' for m in available_models)
@@ -34,20 +61,18 @@ class RouterAgent(BaseAgent):
             model_name = self.config.model_assignments.get(subprompt.task_type)
             if model_name not in available_models and available_models:
                 model_name = available_models[0]
-            model_params = self.config.model_parameters.get(model_name, {})
-            assignment = ModelAssignment(
-                model_name=model_name,
-                model_provider=self._get_provider(model_name),
-                parameters=model_params
-            )
+            assignment = self.make_assignment(model_name)
+            model_params = assignment.parameters
             self._log_info("Assigned model directly in cloud-only mode", subprompt_id=subprompt.id, model_name=model_name, parameters=model_params)
             return assignment
-        prompt = META_ROUTER_PROMPT_TEMPLATE.format(
-            subtask=subprompt.content,
-            model_list="\n- ".join([""].__add__(available_models))
-        )
+        if len(available_models) == 1:
+            # A single candidate needs no meta-router round-trip
+            assignment = self.make_assignment(available_models[0])
+            self._log_info("Assigned the only available model", subprompt_id=subprompt.id, model_name=assignment.model_name, parameters=assignment.parameters)
+            return assignment
+        prompt = _build_router_prompt(subprompt.content, self._model_list_block)
         try:
-            response = call_ollama(prompt)
+            response = self._call_meta_router(prompt)
             model_name = response.strip()
             if model_name not in available_models:
                 # Fallback: try to extract model name from response
@@ -64,12 +89,8 @@ class RouterAgent(BaseAgent):
                 fallback_model = None
             model_name = fallback_model
         
-        model_params = self.config.model_parameters.get(model_name, {})
-        assignment = ModelAssignment(
-            model_name=model_name,
-            model_provider=self._get_provider(model_name),
-            parameters=model_params
-        )
+        assignment = self.make_assignment(model_name)
+        model_params = assignment.parameters
         self._log_info("Completed routing (meta-router)", subprompt_id=subprompt.id, model_name=model_name, parameters=model_params)
         return assignment
     
@@ -77,6 +98,28 @@ class RouterAgent(BaseAgent):
         """Alias for process method to maintain consistent interface."""
         return self.process(subprompt)
     
+    async def aroute(self, subprompt: SubPrompt) -> ModelAssignment:
+        """Async variant of :meth:`route`."""
+        return await self.aprocess(subprompt)
+    
+    async def route_batch(self, subprompts: List[SubPrompt], return_exceptions: bool = False) -> List[ModelAssignment]:
+        """Route several subprompts concurrently, at most ``config.max_concurrent_routes`` at a time.
+        
+        Args:
+            subprompts: The subprompts to route
+            return_exceptions: Return a failed routing's exception in its slot instead of raising
+            
+        Returns:
+            One ModelAssignment (or exception) per subprompt, in input order
+        """
+        semaphore = asyncio.Semaphore(self.config.max_concurrent_routes)
+        
+        async def route_one(subprompt: SubPrompt) -> ModelAssignment:
+            async with semaphore:
+                return await self.aroute(subprompt)
+        
+        return await asyncio.gather(*[route_one(sp) for sp in subprompts], return_exceptions=return_exceptions)
+    
     def reassign(self, subprompt: SubPrompt, evaluation: EvaluationResult, last_result: 'ExecutionResult') -> ModelAssignment:
         """Reassign a subprompt to a different model after a failed attempt.
         Args:
@@ -87,34 +130,71 @@ class RouterAgent(BaseAgent):
             New ModelAssignment with potentially different model or parameters
         """
         self._log_info("Reassigning subprompt after failed attempt", subprompt_id=subprompt.id, retry_count=evaluation.retry_count)
-        available_models = [m for m in self.config.available_models if m != last_result.model_used.model_name]
+        available_models = tuple(m for m in self._available_models if m != last_result.model_used.model_name)
         if not available_models:
             model_name = last_result.model_used.model_name
             model_params = self._adjust_parameters(last_result.model_used.parameters)
+        elif len(available_models) == 1:
+            # Only one other model left, so skip the meta-router
+            model_name = available_models[0]
+            model_params = self._adjust_parameters(self._get_parameters(model_name))
         else:
-            # Use meta-router again for reassignment
-            prompt = META_ROUTER_PROMPT_TEMPLATE.format(
-                subtask=subprompt.content,
-                model_list="\n- ".join([""].__add__(available_models))
-            )
-            try:
-                response = call_ollama(prompt)
-                model_name = response.strip()
-                if model_name not in available_models:
-                    model_name = extract_model_name_from_response(response, available_models)
-            except Exception as e:
-                self._log_error("Meta-router LLM failed during reassignment, falling back to random", error=e)
-                model_name = random.choice(available_models)
-            model_params = self.config.model_parameters.get(model_name, {})
-        assignment = ModelAssignment(
+            best_model = self.rank_models(subprompt.task_type, available_models)[0]
+            if self._success_counts[(subprompt.task_type, best_model)] >= _CONFIDENT_SUCCESSES:
+                # A model with a proven record on this task type wins without asking the meta-router
+                model_name = best_model
+            else:
+                # Use meta-router again for reassignment
+                prompt = _build_router_prompt(subprompt.content, self._format_model_list(available_models))
+                try:
+                    response = self._call_meta_router(prompt)
+                    model_name = response.strip()
+                    if model_name not in available_models:
+                        model_name = extract_model_name_from_response(response, available_models)
+                except Exception as e:
+                    self._log_error("Meta-router LLM failed during reassignment, falling back to best-ranked model", error=e)
+                    model_name = best_model
+            model_params = self._get_parameters(model_name)
+        assignment = self.make_assignment(model_name, model_params)
+        self._log_info("Completed reassignment (meta-router)", subprompt_id=subprompt.id, new_model=model_name, parameters=assignment.parameters)
+        return assignment
+    
+    def record_outcome(self, subprompt: SubPrompt, assignment: ModelAssignment, evaluation: EvaluationResult) -> None:
+        """Record whether ``assignment`` succeeded on ``subprompt`` so later reassignments can favour proven models."""
+        if evaluation.success:
+            self._success_counts[(subprompt.task_type, assignment.model_name)] += 1
+    
+    def rank_models(self, task_type, models: List[str]) -> List[str]:
+        """Order ``models`` by recorded successes on ``task_type``, most successful first (stable for ties)."""
+        return sorted(models, key=lambda m: -self._success_counts[(task_type, m)])
+    
+    def _call_meta_router(self, prompt: str) -> str:
+        return self._route_cache.get_or_set(prompt, lambda: call_ollama(prompt))
+    
+    @staticmethod
+    def _format_model_list(models) -> str:
+        # Matches the original "\n- ".join(["", *models]): every entry, the first included, starts on a new line
+        return "\n- " + "\n- ".join(models) if models else ""
+    
+    def make_assignment(self, model_name: str, parameters: Optional[Dict[str, Any]] = None) -> ModelAssignment:
+        """Build a ModelAssignment for ``model_name`` using its configured parameters unless overridden."""
+        return ModelAssignment(
             model_name=model_name,
             model_provider=self._get_provider(model_name),
-            parameters=model_params
+            parameters=self._get_parameters(model_name) if parameters is None else parameters
         )
-        self._log_info("Completed reassignment (meta-router)", subprompt_id=subprompt.id, new_model=model_name, parameters=model_params)
-        return assignment
+    
+    def _get_parameters(self, model_name: str):
+        return self._model_parameters.get(model_name, _NO_PARAMETERS)
     
     def _get_provider(self, model_name: str) -> str:
+        provider = self._provider_cache.get(model_name)
+        if provider is None:
+            provider = self._provider_cache[model_name] = self._classify_provider(model_name)
+        return provider
+    
+    @staticmethod
+    def _classify_provider(model_name: str) -> str:
         if "gpt" in model_name:
             return "openai"
         elif "claude" in model_name:
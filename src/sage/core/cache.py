@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM responses.
+
+    Exact hits are served from an LRU dict keyed by the sha256 of ``(namespace, text)``.
+    When an ``embed`` function is given, misses fall back to a semantic lookup: the
+    cached entry of the same namespace whose embedding has the highest cosine similarity
+    with ``text`` is returned if it reaches ``similarity_threshold``. Entries expire after
+    ``ttl`` seconds. If ``directory`` is set, exact entries are also persisted with
+    ``diskcache`` so they survive across runs.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        similarity_threshold: float = 0.95,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+        directory: Optional[str] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._embed = embed
+        # key -> (expires_at, value, namespace, embedding or None)
+        self._entries: "OrderedDict[str, Tuple[float, str, str, Optional[np.ndarray]]]" = OrderedDict()
+        self._index: Optional[Tuple[List[str], np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._disk = None
+        if directory:
+            import diskcache
+            self._disk = diskcache.Cache(directory)
+
+    @staticmethod
+    def key(text: str, namespace: str = "") -> str:
+        """Return the exact-match key for ``text`` within ``namespace``."""
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_or_set(self, text: str, compute: Callable[[], str], namespace: str = "") -> str:
+        """Return the cached response for ``text``, calling ``compute`` and caching its result on a miss.
+
+        Exceptions raised by ``compute`` propagate and nothing is cached.
+        """
+        key = self.key(text, namespace)
+        value = self._get_exact(key)
+        if value is not None:
+            return value
+        embedding = self._embedding(text)
+        if embedding is not None:
+            value = self._get_semantic(embedding, namespace)
+            if value is not None:
+                return value
+        value = compute()
+        self._put(key, value, namespace, embedding)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+        if self._disk is not None:
+            self._disk.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_exact(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+                self._index = None
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._put(key, value, None, None, persist=False)
+                return value
+        return None
+
+    def _get_semantic(self, embedding: np.ndarray, namespace: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            if self._index is None:
+                self._rebuild_index()
+            keys, namespaces, matrix = self._index
+            if not keys:
+                return None
+            scores = matrix @ embedding
+            # Only rows of this namespace above the threshold can hit; rank just those, not the whole index
+            rows = np.flatnonzero((scores >= self.similarity_threshold) & (namespaces == namespace))
+            for row in rows[np.argsort(scores[rows])[::-1]]:
+                entry = self._entries.get(keys[row])
+                if entry is None or entry[0] <= now:
+                    continue
+                self._entries.move_to_end(keys[row])
+                return entry[1]
+        return None
+
+    def _put(self, key: str, value: str, namespace: Optional[str], embedding: Optional[np.ndarray],
+             persist: bool = True) -> None:
+        expires_at = time.time() + self.ttl if self.ttl else math.inf
+        with self._lock:
+            self._entries[key] = (expires_at, value, namespace, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if embedding is not None:
+                self._index = None
+        if persist and self._disk is not None:
+            self._disk.set(key, value, expire=self.ttl)
+
+    def _rebuild_index(self) -> None:
+        keys, namespaces, vectors = [], [], []
+        for key, (_, _, namespace, embedding) in self._entries.items():
+            if embedding is not None:
+                keys.append(key)
+                namespaces.append(namespace)
+                vectors.append(embedding)
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        self._index = (keys, np.array(namespaces, dtype=object), matrix)
+
+    def _embedding(self, text: str) -> Optional[np.ndarray]:
+        if self._embed is None:
+            return None
+        try:
+            # float32 halves the index's memory and the bandwidth of every lookup matmul
+            embedding = np.asarray(self._embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Embedding failed, disabling semantic cache lookups | Error: %s", e)
+            self._embed = None
+            return None
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
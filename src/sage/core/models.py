@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
 class TaskType(str, Enum):
@@ -10,7 +10,15 @@ class TaskType(str, Enum):
     CODE = "code"
     OTHER = "other"
 
-class SubPrompt(BaseModel):
+class _InternalModel(BaseModel):
+    """Base for models that SAGE builds from data it produced itself."""
+
+    @classmethod
+    def fast(cls, **data):
+        """Construct without validation; only for already well-typed internal values."""
+        return cls.model_construct(**data)
+
+class SubPrompt(_InternalModel):
     id: str
     content: str
     task_type: TaskType
@@ -18,13 +26,13 @@ class SubPrompt(BaseModel):
     context: Optional[Dict[str, Any]] = None
     dependencies: List[str] = Field(default_factory=list)
 
-class ModelAssignment(BaseModel):
+class ModelAssignment(_InternalModel):
     model_name: str
     model_provider: str
     parameters: Dict[str, Any] = Field(default_factory=dict)
     model_config = {'protected_namespaces': ()}
 
-class ExecutionResult(BaseModel):
+class ExecutionResult(_InternalModel):
     subprompt_id: str
     content: str
     model_used: ModelAssignment
@@ -33,14 +41,14 @@ class ExecutionResult(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
     model_config = {'protected_namespaces': ()}
 
-class EvaluationResult(BaseModel):
+class EvaluationResult(_InternalModel):
     subprompt_id: str
     success: bool
     similarity_score: float
     feedback: Optional[str] = None
     retry_count: int = 0
 
-class AggregatedResponse(BaseModel):
+class AggregatedResponse(_InternalModel):
     final_response: str
     execution_results: List[ExecutionResult]
     metadata: Dict[str, Any] = Field(default_factory=dict)
@@ -57,4 +65,17 @@ class SAGEConfig(BaseModel):
     model_parameters: Dict[str, dict] = Field(default_factory=dict)
     evaluator_model: Optional[str] = None
     model_provider_map: Dict[str, str] = Field(default_factory=dict)
+    verbose: bool = True
+    aggregator_order: Literal["submission", "exec_time"] = "submission"
+    max_concurrency: int = Field(default=4, ge=1)
+    max_parallel_retries: int = Field(default=2, ge=1)
+    max_concurrent_routes: int = Field(default=4, ge=1)
+    evaluator_cache: bool = True
+    evaluator_semantic_cache: bool = False
+    executor_cache: bool = False
+    executor_semantic_cache: bool = False
+    cache_max_size: int = 1024
+    cache_ttl: Optional[float] = 3600.0
+    cache_similarity_threshold: float = 0.95
+    cache_dir: Optional[str] = None
     model_config = {'protected_namespaces': ()} 
\ No newline at end of file
@@ -1,38 +1,167 @@
+import functools
+import json
+import re
 import requests
-from typing import List
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Sequence, Tuple
 import os
+import yaml
 from dotenv import load_dotenv
-from google import genai
+
+if TYPE_CHECKING:
+    # Annotation-only; both are imported lazily where they are used
+    from google import genai
+    from sentence_transformers import SentenceTransformer
 
 load_dotenv()
 
-def call_ollama(prompt: str, model: str = "deepseek-r1:1.5b", base_url: str = "http://localhost:11434") -> str:
+# Connections kept alive per host, and the number of hosts whose pools are kept
+_DEFAULT_POOL_MAXSIZE = 32
+_POOL_CONNECTIONS = 16
+
+def configure_http_session(pool_maxsize: int = _DEFAULT_POOL_MAXSIZE) -> requests.Session:
     """
-    Call the Ollama API with the given prompt and model.
-    Supported models include: 'gemma3:4b', 'deepseek-r1:1.5b', 'qwen3:1.7b'.
-    Returns the response as a string.
+    Return the shared keep-alive session used for LLM HTTP calls, growing its pool if needed.
+    pool_maxsize should cover the number of concurrent calls so connections are reused rather than discarded.
+    The session is only rebuilt when pool_maxsize exceeds the current pool; the one it replaces is closed
+    (calls already streaming from it finish, and their connections are then discarded).
+    A stale keep-alive connection is retried once on connect errors; failed generations are never replayed.
+    """
+    global _SESSION, _SESSION_POOL_MAXSIZE
+    pool_maxsize = max(pool_maxsize, _DEFAULT_POOL_MAXSIZE)
+    with _SESSION_LOCK:
+        if _SESSION is not None and pool_maxsize <= _SESSION_POOL_MAXSIZE:
+            return _SESSION
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=1, connect=1, read=0, status=0)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        previous, _SESSION, _SESSION_POOL_MAXSIZE = _SESSION, session, pool_maxsize
+    if previous is not None:
+        previous.close()
+    return session
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_POOL_MAXSIZE = 0
+_SESSION_LOCK = threading.Lock()
+configure_http_session()
+
+# libyaml's C loader when PyYAML was built with it, else the pure-Python safe loader
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def load_yaml(path) -> dict:
+    """
+    Safely parse the YAML file at path, using the libyaml-backed loader when available.
+    """
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+class CallCancelled(Exception):
+    """Raised when an in-flight LLM call is stopped through its cancel event."""
+
+def stream_ollama(prompt: str, model: str = "deepseek-r1:1.5b", base_url: str = "http://localhost:11434",
+                  cancel: Optional[threading.Event] = None) -> Iterator[str]:
+    """
+    Stream a generation from the Ollama API, yielding response chunks as the model produces them.
+    If cancel is set, the stream is closed at the next chunk and CallCancelled is raised.
+    Raises RuntimeError if Ollama reports an error mid-stream.
     """
+    if cancel is not None and cancel.is_set():
+        raise CallCancelled(f"Ollama call to {model} cancelled")
     url = f"{base_url}/api/generate"
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False
+        "stream": True
     }
-    response = requests.post(url, json=payload)
-    response.raise_for_status()
-    data = response.json()
-    return data.get("response", "").strip()
+    with _SESSION.post(url, json=payload, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if cancel is not None and cancel.is_set():
+                raise CallCancelled(f"Ollama call to {model} cancelled")
+            if not line:
+                continue
+            data = json.loads(line)
+            if "error" in data:
+                raise RuntimeError(f"Ollama error: {data['error']}")
+            chunk = data.get("response")
+            if chunk:
+                yield chunk
+            if data.get("done"):
+                break
+
+def call_ollama(prompt: str, model: str = "deepseek-r1:1.5b", base_url: str = "http://localhost:11434",
+                cancel: Optional[threading.Event] = None) -> str:
+    """
+    Call the Ollama API with the given prompt and model.
+    Supported models include: 'gemma3:4b', 'deepseek-r1:1.5b', 'qwen3:1.7b'.
+    Returns the response as a string; raises CallCancelled if cancel is set before it completes.
+    """
+    return "".join(stream_ollama(prompt, model=model, base_url=base_url, cancel=cancel)).strip()
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_model(name: str = "all-MiniLM-L6-v2") -> "SentenceTransformer":
+    """
+    Load a SentenceTransformer once per process and share it across agents.
+    sentence_transformers (and torch) are imported on first use rather than with this module.
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+def embed_text(text: str):
+    """
+    Return the normalized embedding of text from the shared embedding model.
+    """
+    return get_embedding_model().encode(text, normalize_embeddings=True)
+
+@functools.lru_cache(maxsize=32)
+def _model_name_matcher(models: Tuple[str, ...]) -> Tuple["re.Pattern[str]", Dict[str, str]]:
+    """
+    Compile one case-folded alternation over the model names, longest first so that a name
+    which prefixes another cannot shadow it, plus the map from lowered name back to the original.
+    """
+    originals: Dict[str, str] = {}
+    for model in models:
+        originals.setdefault(model.lower(), model)
+    pattern = re.compile("|".join(re.escape(m) for m in sorted(originals, key=len, reverse=True)))
+    return pattern, originals
 
-def extract_model_name_from_response(response: str, available_models: List[str]) -> str:
+def extract_model_name_from_response(response: str, available_models: Sequence[str]) -> str:
     """
     Extracts the model name from the LLM response by matching against available models.
-    Returns the first match found, or raises ValueError if none found.
+    All names are searched for in a single pass; the one mentioned earliest in the response wins.
+    Pass available_models as a tuple to skip a conversion on every call.
+    Raises ValueError if none found.
+    """
+    if not isinstance(available_models, tuple):
+        available_models = tuple(available_models)
+    model = _extract_model_name(response, available_models)
+    if model is None:
+        raise ValueError(f"No valid model name found in response: {response}")
+    return model
+
+@functools.lru_cache(maxsize=1024)
+def _extract_model_name(response: str, available_models: Tuple[str, ...]) -> Optional[str]:
+    # Memoized on (response, models): meta-router replies repeat across sub-prompts and retries
+    pattern, originals = _model_name_matcher(available_models)
+    match = pattern.search(response.lower()) if originals else None
+    return originals[match.group(0)] if match is not None else None
+
+@functools.lru_cache(maxsize=4)
+def _gemini_client(api_key: str) -> "genai.Client":
+    """
+    Return a Gemini client for api_key, built once and shared by every call.
+    Reusing the client keeps its HTTP connection pool (and TLS sessions) alive between requests.
+    The Gemini SDK is imported here so Ollama-only runs never load it.
     """
-    response_lower = response.lower()
-    for model in available_models:
-        if model.lower() in response_lower:
-            return model
-    raise ValueError(f"No valid model name found in response: {response}")
+    from google import genai
+    return genai.Client(api_key=api_key)
 
 def call_gemini(prompt: str, model: str = "models/gemini-2.5-flash-preview-05-20", api_key: str = None, parameters: dict = None) -> str:
     """
@@ -43,7 +172,7 @@ def call_gemini(prompt: str, model: str = "models/gemini-2.5-flash-preview-05-20
         api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not set in environment or .env file.")
-    client = genai.Client(api_key=api_key)
+    client = _gemini_client(api_key)
     response = client.models.generate_content(
         model=model,
         contents=prompt
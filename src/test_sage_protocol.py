@@ -1,4 +1,7 @@
 import argparse
+import asyncio
+import sys
+import threading
 from sage import SAGE
 from rich.console import Console
 from rich.panel import Panel
@@ -8,11 +11,18 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich import box
 from rich.live import Live
 from rich.align import Align
-import time
-import random
-import yaml
+from rich.style import Style
 from pathlib import Path
 from sage.core.models import SAGEConfig, TaskType
+from sage.core.utils import load_yaml
+
+# Column and panel styles built once instead of re-parsing style strings per table
+S_BOLD = Style(bold=True)
+S_WHITE = Style(color="white")
+S_GREEN = Style(color="green")
+S_CYAN = Style(color="cyan")
+S_YELLOW = Style(color="yellow")
+S_MAGENTA = Style(color="magenta")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the SAGE protocol on a prompt.")
@@ -41,15 +51,9 @@ if __name__ == "__main__":
 ███████║██║  ██║╚██████╔╝███████╗
 ╚══════╝╚═╝  ╚═╝ ╚═════╝ ╚══════╝
 '''
-    # Center and color the ASCII art in green
-    for line in ascii_art.strip().splitlines():
-        console.print(f"[bold green]{line.center(50)}[/bold green]", justify="center")
-
-    # Animated loading dots
-    with Live(Align.center("[green]Initializing", vertical="middle"), refresh_per_second=4, console=console) as live:
-        for i in range(8):
-            live.update(Align.center(f"[green]Initializing{'.' * (i % 4)}", vertical="middle"))
-            time.sleep(0.2)
+    # Center and color the ASCII art in green, rendered as one styled Text
+    banner = Text("\n".join(line.center(50) for line in ascii_art.strip().splitlines()), style="bold green")
+    console.print(banner, justify="center")
 
     # --- NEW: Ask user for Local/Cloud choice ---
     console.rule("[bold blue]Select LLM Provider Type[/bold blue]")
@@ -69,24 +73,35 @@ if __name__ == "__main__":
 
     # --- Load and filter config ---
     config_path = Path(__file__).parent.parent / "config" / "settings.yaml"
-    with open(config_path, "r") as f:
-        config_dict = yaml.safe_load(f)
+    config_dict = load_yaml(config_path)
     model_provider_map = config_dict.get("model_provider_map", {})
-    # Filter available_models
-    filtered_models = [m for m in config_dict["available_models"] if model_provider_map.get(m, "local") == provider_type_str]
-    # Filter model_assignments
+    model_parameters = config_dict["model_parameters"]
+    # Filter available_models, model_parameters and model_provider_map in one pass over the models
+    filtered_models = []
+    filtered_parameters = {}
+    filtered_provider_map = {}
+    for m in config_dict["available_models"]:
+        provider = model_provider_map.get(m, "local")
+        if provider != provider_type_str:
+            continue
+        filtered_models.append(m)
+        if m in model_parameters:
+            filtered_parameters[m] = model_parameters[m]
+        if m in model_provider_map:
+            filtered_provider_map[m] = provider
+    filtered_models_set = set(filtered_models)
+    # Filter model_assignments, keyed by TaskType as SAGEConfig expects
     filtered_assignments = {}
-    for k in ["creative", "technical", "summarization", "analysis", "code", "other"]:
-        v = config_dict["model_assignments"].get(k)
-        if v in filtered_models:
-            filtered_assignments[k] = v
+    model_assignments = config_dict["model_assignments"]
+    for task_type in TaskType:
+        v = model_assignments.get(task_type.value)
+        if v in filtered_models_set:
+            filtered_assignments[task_type] = v
         elif filtered_models:
-            filtered_assignments[k] = filtered_models[0]
-    # Filter model_parameters
-    filtered_parameters = {k: v for k, v in config_dict["model_parameters"].items() if k in filtered_models}
+            filtered_assignments[task_type] = filtered_models[0]
     # Filter evaluator_model if needed
     filtered_evaluator_model = config_dict.get("evaluator_model")
-    if filtered_evaluator_model not in filtered_models:
+    if filtered_evaluator_model not in filtered_models_set:
         filtered_evaluator_model = None
     # Build filtered config
     filtered_config = dict(config_dict)
@@ -95,11 +110,11 @@ if __name__ == "__main__":
     filtered_config["model_parameters"] = filtered_parameters
     filtered_config["evaluator_model"] = filtered_evaluator_model
     # Only keep relevant model_provider_map
-    filtered_config["model_provider_map"] = {k: v for k, v in model_provider_map.items() if k in filtered_models}
+    filtered_config["model_provider_map"] = filtered_provider_map
     # Log and display config
     config_table = Table(title="Filtered Model Configuration", box=box.SIMPLE)
-    config_table.add_column("Model Name", style="bold")
-    config_table.add_column("Provider Type", style="cyan")
+    config_table.add_column("Model Name", style=S_BOLD)
+    config_table.add_column("Provider Type", style=S_CYAN)
     for m in filtered_models:
         config_table.add_row(m, model_provider_map.get(m, "local"))
     console.print(config_table)
@@ -111,17 +126,39 @@ if __name__ == "__main__":
     logger.info(f"Filtered models: {filtered_models}")
     # Set default_model to a valid model
     filtered_default_model = config_dict.get("default_model")
-    if filtered_default_model not in filtered_models and filtered_models:
+    if filtered_default_model not in filtered_models_set and filtered_models:
         filtered_default_model = filtered_models[0]
     filtered_config["default_model"] = filtered_default_model
     # Build SAGEConfig object
     sage_config = SAGEConfig(**filtered_config)
 
+    # Initialize SAGE protocol with filtered config in the background while the user reads the config
+    init = {}
+
+    def init_sage():
+        try:
+            init["sage"] = SAGE(config_obj=sage_config)
+        except Exception as e:
+            init["error"] = e
+
+    init_thread = threading.Thread(target=init_sage, daemon=True)
+    init_thread.start()
+
     console.print("[bold bright_cyan]Press [bold]Enter[/bold] to continue[/bold bright_cyan]", justify="center")
     input()
 
-    # Initialize SAGE protocol with filtered config
-    sage = SAGE(config_obj=sage_config)
+    # Animated loading dots, only while initialization is still running on an interactive terminal
+    if init_thread.is_alive() and sys.stdout.isatty():
+        with Live(Align.center("[green]Initializing", vertical="middle"), refresh_per_second=4, console=console) as live:
+            i = 0
+            while init_thread.is_alive():
+                live.update(Align.center(f"[green]Initializing{'.' * (i % 4)}", vertical="middle"))
+                init_thread.join(0.2)
+                i += 1
+    init_thread.join()
+    if "error" in init:
+        raise init["error"]
+    sage = init["sage"]
 
     # Prompt
     prompt = args.prompt or (
@@ -132,10 +169,10 @@ if __name__ == "__main__":
     )
 
     console.rule("[bold blue]SAGE Protocol: Sequential Agent Goal Execution[/bold blue]")
-    console.print(Panel(prompt, title="[bold]Input Prompt[/bold]", style="cyan"))
+    console.print(Panel(Text(prompt), title="[bold]Input Prompt[/bold]", style=S_CYAN))
 
     # Run the protocol with progress
-    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), transient=True, console=console) as progress:
+    with Progress(SpinnerColumn(), TextColumn("{task.description}", style="progress.description", markup=False), transient=True, console=console) as progress:
         task = progress.add_task("Decomposing prompt...", total=None)
         subprompts = sage.decomposer.decompose(prompt)
         progress.update(task, description=f"Decomposed into {len(subprompts)} sub-prompts.")
@@ -143,10 +180,10 @@ if __name__ == "__main__":
 
         # Show sub-prompts
         table = Table(title="Sub-Prompts", box=box.SIMPLE, show_lines=True)
-        table.add_column("#", style="bold")
-        table.add_column("Content", style="white")
-        table.add_column("Task Type", style="magenta")
-        table.add_column("Expected Goal", style="green")
+        table.add_column("#", style=S_BOLD)
+        table.add_column("Content", style=S_WHITE)
+        table.add_column("Task Type", style=S_MAGENTA)
+        table.add_column("Expected Goal", style=S_GREEN)
         for i, sp in enumerate(subprompts):
             table.add_row(str(i+1), sp.content, str(sp.task_type), sp.expected_goal)
         console.print(table)
@@ -161,32 +198,45 @@ if __name__ == "__main__":
         progress.update(task, description="Model assignment complete.")
         progress.stop_task(task)
 
-        # Execution & evaluation
-        results = []
+        # Execution & evaluation: every sub-prompt is executed concurrently, then all results are evaluated
+        # together so the similarity fallback embeds them in one batch
+        done = []
+
+        def report_done(i, result):
+            done.append(i)
+            progress.update(task, description=f"SubPrompt {i+1} ({assignments[i].model_name}) done [{len(done)}/{len(subprompts)}]...")
+
+        async def execute_and_evaluate_all():
+            executed = await sage.executor.execute_many(list(zip(subprompts, assignments)), on_result=report_done)
+            for outcome in executed:
+                if isinstance(outcome, Exception):
+                    raise outcome
+            progress.update(task, description=f"Evaluating {len(subprompts)} results...")
+            evaluations = await sage.evaluator.aevaluate_many(executed, subprompts)
+            return list(zip(executed, evaluations))
+
         progress.start_task(task)
-        for i, (subprompt, assignment) in enumerate(zip(subprompts, assignments)):
-            progress.update(task, description=f"Executing SubPrompt {i+1} ({assignment.model_name})...")
-            result = sage.executor.execute(subprompt, assignment)
-            evaluation = sage.evaluator.evaluate(result, subprompt)
-            results.append((subprompt, assignment, result, evaluation))
+        progress.update(task, description=f"Executing {len(subprompts)} sub-prompts...")
+        outcomes = asyncio.run(execute_and_evaluate_all())
+        results = [(sp, asg, result, evaluation) for sp, asg, (result, evaluation) in zip(subprompts, assignments, outcomes)]
         progress.update(task, description="Execution and evaluation complete.")
         progress.stop_task(task)
 
     # Show results table
     console.rule("[bold green]Sub-Prompt Results[/bold green]")
     result_table = Table(box=box.MINIMAL_DOUBLE_HEAD)
-    result_table.add_column("#", style="bold")
-    result_table.add_column("Model", style="yellow")
-    result_table.add_column("Success", style="green")
-    result_table.add_column("Similarity", style="cyan")
-    result_table.add_column("Content", style="white")
+    result_table.add_column("#", style=S_BOLD)
+    result_table.add_column("Model", style=S_YELLOW)
+    result_table.add_column("Success", style=S_GREEN)
+    result_table.add_column("Similarity", style=S_CYAN)
+    result_table.add_column("Content", style=S_WHITE)
     for i, (subprompt, assignment, result, evaluation) in enumerate(results):
         result_table.add_row(
             str(i+1),
             assignment.model_name,
             "✅" if evaluation.success else "❌",
             f"{evaluation.similarity_score:.2f}",
-            (result.content[:80] + ("..." if len(result.content) > 80 else ""))
+            Text(result.content[:80] + ("..." if len(result.content) > 80 else ""))
         )
     console.print(result_table)
 
@@ -194,18 +244,19 @@ if __name__ == "__main__":
     if args.verbose:
         for i, (subprompt, assignment, result, evaluation) in enumerate(results):
             console.rule(f"[bold]SubPrompt {i+1} Details[/bold]", style="blue")
-            console.print(f"[bold]Prompt:[/bold] {subprompt.content}")
-            console.print(f"[bold]Model:[/bold] {assignment.model_name}")
-            console.print(f"[bold]Output:[/bold] {result.content}")
+            # LLM text is printed as plain Text so brackets in it are never parsed as markup
+            console.print(Text.assemble(("Prompt: ", S_BOLD), subprompt.content))
+            console.print(Text.assemble(("Model: ", S_BOLD), assignment.model_name))
+            console.print(Text.assemble(("Output: ", S_BOLD), result.content))
             console.print(f"[bold]Success:[/bold] {'✅' if evaluation.success else '❌'}")
             console.print(f"[bold]Similarity:[/bold] {evaluation.similarity_score:.2f}")
-            console.print(f"[bold]Feedback:[/bold] {evaluation.feedback}")
+            console.print(Text.assemble(("Feedback: ", S_BOLD), str(evaluation.feedback)))
             console.print("")
 
     # Aggregate and show final response
     agg = sage.aggregator.aggregate([r[2] for r in results])
     console.rule("[bold blue]Final Aggregated Response[/bold blue]")
-    console.print(Panel(agg.final_response, title="[bold]Final Response[/bold]", style="green"))
+    console.print(Panel(Text(agg.final_response), title="[bold]Final Response[/bold]", style=S_GREEN))
 
     # Show metadata summary
     meta_table = Table(title="Run Metadata", box=box.SIMPLE)
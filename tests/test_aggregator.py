@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+import sage.agents.aggregator as aggregator_module
+from sage.agents.aggregator import Aggregator
+from sage.core.models import ExecutionResult, ModelAssignment, SAGEConfig
+
+
+def make_results(count, seed=0):
+    rng = random.Random(seed)
+    assignment = ModelAssignment(model_name="m", model_provider="unknown")
+    results = []
+    for i in range(count):
+        # Coarse times so ties exercise the stable ordering; some results carry no execution time at all
+        metadata = {} if i % 17 == 0 else {"execution_time": rng.choice([0.5, 1.0, 1.5, 2.0, rng.random() * 3])}
+        results.append(ExecutionResult(subprompt_id=str(i), content=f"answer {i}", model_used=assignment,
+                                       success=rng.random() < 0.7, similarity_score=1.0, metadata=metadata))
+    return results
+
+
+@pytest.mark.parametrize("order", ["submission", "exec_time"])
+@pytest.mark.parametrize("count", [0, 1, 5, 300])
+def test_vectorized_combine_matches_the_python_pass(order, count):
+    aggregator = Aggregator(SAGEConfig(aggregator_order=order, verbose=False))
+    results = make_results(count)
+
+    parts, total = aggregator._combine(results)
+    vectorized_parts, vectorized_total = aggregator._combine_vectorized(results)
+
+    assert vectorized_parts == parts
+    assert vectorized_total == pytest.approx(total)
+
+
+@pytest.mark.parametrize("order", ["submission", "exec_time"])
+def test_large_result_lists_take_the_vectorized_path(order, monkeypatch):
+    aggregator = Aggregator(SAGEConfig(aggregator_order=order, verbose=False))
+    results = make_results(aggregator_module._VECTORIZE_MIN_RESULTS)
+    expected_parts, expected_total = aggregator._combine(results)
+    monkeypatch.setattr(aggregator, "_combine", None)
+
+    response = aggregator.aggregate(results)
+
+    assert response.final_response == "\n\n".join(expected_parts)
+    assert response.metadata["num_successful"] == len(expected_parts)
+    assert response.metadata["total_execution_time"] == pytest.approx(expected_total)
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+import sage.core.cache as cache_module
+from sage.core.cache import LLMCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+class Compute:
+    """A compute callback that records how often the cache fell through to it."""
+
+    def __init__(self, value="computed"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+VECTORS = {
+    "sea poem": [1.0, 0.0, 0.0],
+    "ocean poem": [0.99, 0.14, 0.0],
+    "sea poem, again": [0.98, 0.2, 0.0],
+    "tax report": [0.0, 1.0, 0.0],
+    "unrelated": [0.0, 0.0, 1.0],
+}
+
+
+def embed(text):
+    return np.array(VECTORS[text])
+
+
+def test_exact_hit_skips_compute():
+    cache = LLMCache()
+    compute = Compute("first")
+    assert cache.get_or_set("prompt", compute) == "first"
+    assert cache.get_or_set("prompt", Compute("second")) == "first"
+    assert compute.calls == 1
+
+
+def test_namespaces_partition_exact_entries():
+    cache = LLMCache()
+    cache.get_or_set("prompt", Compute("a"), namespace="model-a")
+    assert cache.get_or_set("prompt", Compute("b"), namespace="model-b") == "b"
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LLMCache(ttl=10)
+    cache.get_or_set("prompt", Compute("old"))
+    clock.now += 9
+    assert cache.get_or_set("prompt", Compute("new")) == "old"
+    clock.now += 2
+    assert cache.get_or_set("prompt", Compute("new")) == "new"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMCache(max_size=2)
+    cache.get_or_set("a", Compute("a"))
+    cache.get_or_set("b", Compute("b"))
+    cache.get_or_set("a", Compute())  # Touch "a" so "b" is the oldest
+    cache.get_or_set("c", Compute("c"))
+
+    assert len(cache) == 2
+    assert cache.get_or_set("a", Compute("recomputed")) == "a"
+    assert cache.get_or_set("b", Compute("recomputed")) == "recomputed"
+
+
+def test_compute_errors_propagate_and_are_not_cached():
+    cache = LLMCache()
+
+    def fail():
+        raise RuntimeError("LLM down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("prompt", fail)
+    assert len(cache) == 0
+    assert cache.get_or_set("prompt", Compute("ok")) == "ok"
+
+
+def test_semantic_hit_requires_threshold_and_same_namespace():
+    cache = LLMCache(embed=embed, similarity_threshold=0.95)
+    cache.get_or_set("sea poem", Compute("waves"), namespace="poet")
+
+    assert cache.get_or_set("ocean poem", Compute("miss"), namespace="poet") == "waves"
+    assert cache.get_or_set("ocean poem", Compute("other namespace"), namespace="critic") == "other namespace"
+    assert cache.get_or_set("tax report", Compute("below threshold"), namespace="poet") == "below threshold"
+
+
+def test_semantic_lookup_prefers_the_closest_entry():
+    cache = LLMCache(embed=embed, similarity_threshold=0.5)
+    cache.get_or_set("ocean poem", Compute("close"))
+    cache.get_or_set("tax report", Compute("far"))
+    assert cache.get_or_set("sea poem, again", Compute("miss")) == "close"
+
+
+def test_semantic_lookup_ignores_evicted_and_expired_entries(clock):
+    cache = LLMCache(embed=embed, max_size=1, ttl=10, similarity_threshold=0.95)
+    cache.get_or_set("sea poem", Compute("waves"))
+    cache.get_or_set("tax report", Compute("numbers"))  # Evicts "sea poem"
+    assert cache.get_or_set("ocean poem", Compute("fresh")) == "fresh"
+
+    clock.now += 11
+    assert cache.get_or_set("ocean poem", Compute("after expiry")) == "after expiry"
+
+
+def test_embedding_failure_disables_the_semantic_tier():
+    def broken_embed(text):
+        raise RuntimeError("no model")
+
+    cache = LLMCache(embed=broken_embed)
+    assert cache.get_or_set("prompt", Compute("value")) == "value"
+    assert cache.get_or_set("prompt", Compute()) == "value"
+    assert cache._embed is None
+
+
+def test_exact_entries_persist_to_disk(tmp_path):
+    pytest.importorskip("diskcache")
+    LLMCache(directory=str(tmp_path)).get_or_set("prompt", Compute("saved"), namespace="model")
+
+    restored = LLMCache(directory=str(tmp_path))
+    compute = Compute("recomputed")
+    assert restored.get_or_set("prompt", compute, namespace="model") == "saved"
+    assert compute.calls == 0
@@ -0,0 +1,73 @@
+import pytest
+
+from sage.agents.decomposer import DecomposerAgent
+from sage.core.models import SAGEConfig, TaskType
+
+
+def classify_like_the_original(step):
+    """The if/elif chain the rule table replaced."""
+    step_lower = step.lower()
+    if "analyz" in step_lower:
+        return TaskType.ANALYSIS, "Identify and explain main challenges"
+    elif "propos" in step_lower or "solution" in step_lower:
+        return TaskType.TECHNICAL, "Propose a technical solution with sensors, data infrastructure, and AI models"
+    elif "summary" in step_lower or "persuasive" in step_lower:
+        return TaskType.CREATIVE, "Write a persuasive summary for city officials"
+    elif "identify" in step_lower:
+        return TaskType.ANALYSIS, "Identification of main ethical and operational challenges."
+    elif "suggest" in step_lower:
+        return TaskType.TECHNICAL, "Suggest a technical architecture, including data sources, model types, and privacy safeguards."
+    elif "draft" in step_lower or "plan" in step_lower:
+        return TaskType.CREATIVE, "Draft a communication plan to explain the system to patients and staff, addressing concerns and highlighting benefits."
+    elif "explain" in step_lower:
+        return TaskType.CREATIVE, "Provide a clear explanation as requested."
+    elif "list" in step_lower:
+        return TaskType.OTHER, "List the required items or points."
+    return TaskType.OTHER, "Complete the sub-task"
+
+
+def classify(step):
+    subprompt, = DecomposerAgent(SAGEConfig(verbose=False)).decompose(step)
+    return subprompt.task_type, subprompt.expected_goal
+
+
+@pytest.mark.parametrize("step, task_type", [
+    ("Analyze the traffic data", TaskType.ANALYSIS),
+    ("Propose a fix", TaskType.TECHNICAL),
+    ("Find a solution", TaskType.TECHNICAL),
+    ("Write a summary", TaskType.CREATIVE),
+    ("Make it persuasive", TaskType.CREATIVE),
+    ("Identify the risks", TaskType.ANALYSIS),
+    ("Suggest an architecture", TaskType.TECHNICAL),
+    ("Draft an email", TaskType.CREATIVE),
+    ("Write a plan", TaskType.CREATIVE),
+    ("Explain recursion", TaskType.CREATIVE),
+    ("List the sensors", TaskType.OTHER),
+    ("Do something else", TaskType.OTHER),
+])
+def test_each_rule_keyword_classifies_like_the_original(step, task_type):
+    assert classify(step) == classify_like_the_original(step)
+    assert classify(step)[0] == task_type
+
+
+@pytest.mark.parametrize("step, task_type", [
+    ("analyze and propose", TaskType.ANALYSIS),
+    ("propose a fix, then analyze it", TaskType.ANALYSIS),
+    ("list, explain and suggest a solution", TaskType.TECHNICAL),
+    ("Explain the plan", TaskType.CREATIVE),
+    ("Identify, then SUMMARY", TaskType.CREATIVE),
+    ("planalyze", TaskType.ANALYSIS),
+])
+def test_earlier_rules_win_regardless_of_position_or_case(step, task_type):
+    assert classify(step) == classify_like_the_original(step)
+    assert classify(step)[0] == task_type
+
+
+def test_numbered_steps_are_split_and_classified():
+    subprompts = DecomposerAgent(SAGEConfig(verbose=False)).decompose("1. Analyze the data 2. Suggest sensors 3. List costs")
+
+    assert [(sp.content, sp.task_type) for sp in subprompts] == [
+        ("Analyze the data", TaskType.ANALYSIS),
+        ("Suggest sensors", TaskType.TECHNICAL),
+        ("List costs", TaskType.OTHER),
+    ]
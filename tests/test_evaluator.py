@@ -0,0 +1,158 @@
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+import sage.agents.evaluator as evaluator_module
+from sage.agents.evaluator import Evaluator, _parse_eval
+from sage.core.models import ExecutionResult, ModelAssignment, SAGEConfig, SubPrompt, TaskType
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("YES (0.95): The answer is correct and complete.", (True, 0.95)),
+    ("NO (0.2): The answer is missing key details.", (False, 0.2)),
+    ("no", (False, None)),
+    ("Confidence 0.4, hard to say", (None, 0.4)),
+    ("Yes, I am certain (1)", (True, 1.0)),
+    ("Yesterday nothing happened", (None, None)),
+    ("", (None, None)),
+    ("<think>Okay, no problems.</think>\nYES (0.9)", (True, 0.9)),
+    ("The answer has no errors. YES (0.92)", (True, 0.92)),
+    ("<think>Yes, this looks right at first.</think>\nNO (0.3): It misses a step.", (False, 0.3)),
+    ("**YES** (0.8)", (True, 0.8)),
+    ("The answer does not cover it, so no.", (False, None)),
+])
+def test_parse_eval(reply, expected):
+    assert _parse_eval(reply) == expected
+
+
+def test_parse_eval_keeps_the_first_verdict_and_confidence():
+    assert _parse_eval("NO (0.3). On reflection, yes (0.9).") == (False, 0.3)
+
+
+class StubEncoder:
+    """Embeds each text as a fixed 2-d vector; ``calls`` records every batch passed to encode."""
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=False):
+        self.calls.append(list(texts))
+        rows = np.array([self.vectors.get(text, (1.0, 0.0)) for text in texts], dtype=np.float64)
+        if normalize_embeddings:
+            rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+        return rows
+
+
+def answer_vector(score):
+    """A vector whose cosine with the default (1, 0) question vector is ``score``."""
+    return (score, math.sqrt(1.0 - score * score))
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    stub = StubEncoder()
+    monkeypatch.setattr(evaluator_module, "get_embedding_model", lambda *args, **kwargs: stub)
+    return stub
+
+
+def make_evaluator(**overrides):
+    settings = dict(evaluator_model="judge", evaluator_cache=False, verbose=False)
+    settings.update(overrides)
+    return Evaluator(SAGEConfig(**settings))
+
+
+def make_pair(answer, question, id=None, success=True):
+    id = id or question
+    subprompt = SubPrompt(id=id, content=question, task_type=TaskType.OTHER, expected_goal="")
+    result = ExecutionResult(subprompt_id=id, content=answer, success=success, similarity_score=1.0,
+                             model_used=ModelAssignment(model_name="m", model_provider="unknown"))
+    return result, subprompt
+
+
+def test_similarity_scores_empty_and_verbatim_pairs_without_embedding(encoder):
+    evaluator = make_evaluator()
+    pairs = [make_pair("", "q1"), make_pair("same", "same"), make_pair("a4", "q4")]
+    encoder.vectors["a4"] = answer_vector(0.5)
+
+    evaluations = evaluator._evaluate_similarity([r for r, _ in pairs], [sp for _, sp in pairs])
+
+    assert [(e.subprompt_id, e.similarity_score, e.success) for e in evaluations] == [
+        ("q1", 0.0, False), ("same", 1.0, True), ("q4", pytest.approx(0.5), False)]
+    assert encoder.calls == [["a4", "q4"]]
+
+
+def test_similarity_skips_the_encoder_when_every_pair_is_trivial(encoder):
+    evaluator = make_evaluator()
+    pairs = [make_pair("x", ""), make_pair("same", "same")]
+
+    evaluations = evaluator._evaluate_similarity([r for r, _ in pairs], [sp for _, sp in pairs])
+
+    assert [e.similarity_score for e in evaluations] == [0.0, 1.0]
+    assert encoder.calls == []
+
+
+def test_empty_answer_fails_without_an_llm_call(encoder, monkeypatch):
+    def no_llm(*args, **kwargs):
+        raise AssertionError("the evaluator LLM should not be called")
+
+    monkeypatch.setattr(evaluator_module, "call_ollama", no_llm)
+    result, subprompt = make_pair("", "q")
+
+    evaluation = make_evaluator().evaluate(result, subprompt)
+
+    assert (evaluation.success, evaluation.similarity_score, evaluation.feedback) == (False, 0.0, "Empty answer")
+
+
+def judge_unless_offline(prompt, model="", cancel=None, base_url=None):
+    if "offline" in prompt:
+        raise ConnectionError("evaluator LLM unreachable")
+    return "YES (0.9)"
+
+
+@pytest.mark.parametrize("run", [
+    lambda evaluator, results, subprompts: evaluator.evaluate_batch(results, subprompts),
+    lambda evaluator, results, subprompts: asyncio.run(evaluator.aevaluate_many(results, subprompts)),
+], ids=["evaluate_batch", "aevaluate_many"])
+def test_batch_keeps_input_order_and_embeds_llm_failures_in_one_pass(encoder, monkeypatch, run):
+    monkeypatch.setattr(evaluator_module, "call_ollama", judge_unless_offline)
+    encoder.vectors.update({"offline one": answer_vector(0.2), "offline two": answer_vector(0.95), "offline three": answer_vector(0.5)})
+    pairs = [
+        make_pair("good", "q-a"),
+        make_pair("offline one", "q-dup", id="1"),
+        make_pair("offline two", "q-dup", id="2"),
+        make_pair("", "q-b", success=False),
+        make_pair("offline three", "q-c"),
+    ]
+
+    evaluations = run(make_evaluator(), [r for r, _ in pairs], [sp for _, sp in pairs])
+
+    assert [(e.subprompt_id, e.success, e.similarity_score) for e in evaluations] == [
+        ("q-a", True, 0.9),
+        ("1", False, pytest.approx(0.2)),
+        ("2", True, pytest.approx(0.95)),
+        ("q-b", False, 0.0),
+        ("q-c", False, pytest.approx(0.5)),
+    ]
+    # The repeated question is embedded once, in the same pass as every fallback answer
+    assert encoder.calls == [["offline one", "offline two", "offline three", "q-dup", "q-c"]]
+
+
+def test_question_embeddings_are_reused_and_evicted_least_recently_used_first(encoder, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "_QUESTION_EMBEDDINGS_MAX", 2)
+    evaluator = make_evaluator()
+
+    def score(question):
+        result, subprompt = make_pair("answer", question)
+        evaluator._evaluate_similarity([result], [subprompt])
+        return encoder.calls[-1]
+
+    assert score("q1") == ["answer", "q1"]
+    assert score("q2") == ["answer", "q2"]
+    assert score("q1") == ["answer"]
+    # q1 was just used, so adding q3 evicts q2
+    assert score("q3") == ["answer", "q3"]
+    assert score("q1") == ["answer"]
+    assert score("q2") == ["answer", "q2"]
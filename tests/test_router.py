@@ -0,0 +1,111 @@
+import pytest
+
+import sage.agents.router as router_module
+from sage.agents.router import META_ROUTER_PROMPT_TEMPLATE, RouterAgent, _build_router_prompt
+from sage.core.models import EvaluationResult, ExecutionResult, SAGEConfig, SubPrompt, TaskType
+
+
+@pytest.mark.parametrize("models", [["a", "b"], ["only"], []])
+def test_model_list_matches_the_original_format(models):
+    assert RouterAgent._format_model_list(models) == "\n- ".join([""] + list(models))
+
+
+def test_router_prompt_matches_str_format():
+    model_list = RouterAgent._format_model_list(["gemma3:4b", "qwen3:1.7b"])
+    expected = META_ROUTER_PROMPT_TEMPLATE.format(subtask="Write {a} poem", model_list=model_list)
+    assert _build_router_prompt("Write {a} poem", model_list) == expected
+
+
+def make_router(models, monkeypatch, reply=None):
+    """A router over ``models`` whose meta-router returns ``reply``, or fails the test if ``reply`` is None."""
+    calls = []
+
+    def meta_router(prompt, **kwargs):
+        calls.append(prompt)
+        if reply is None:
+            raise AssertionError("the meta-router should not be called")
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(router_module, "call_ollama", meta_router)
+    config = SAGEConfig(available_models=models, verbose=False,
+                        model_parameters={m: {"temperature": 0.5, "max_tokens": 100} for m in models})
+    return RouterAgent(config), calls
+
+
+def reassign(router, failed_model, task_type=TaskType.OTHER):
+    subprompt = SubPrompt(id="s", content="Write a haiku", task_type=task_type, expected_goal="")
+    evaluation = EvaluationResult(subprompt_id="s", success=False, similarity_score=0.1, retry_count=1)
+    last_result = ExecutionResult(subprompt_id="s", content="", success=False, similarity_score=0.0,
+                                  model_used=router.make_assignment(failed_model))
+    return router.reassign(subprompt, evaluation, last_result)
+
+
+def succeed(router, model, times, task_type=TaskType.OTHER):
+    subprompt = SubPrompt(id="s", content="x", task_type=task_type, expected_goal="")
+    evaluation = EvaluationResult(subprompt_id="s", success=True, similarity_score=1.0)
+    for _ in range(times):
+        router.record_outcome(subprompt, router.make_assignment(model), evaluation)
+
+
+def test_reassign_retries_the_same_model_with_adjusted_parameters_when_it_is_the_only_one(monkeypatch):
+    router, _ = make_router(["a"], monkeypatch)
+
+    assignment = reassign(router, "a")
+
+    assert assignment.model_name == "a"
+    assert assignment.parameters == {"temperature": pytest.approx(0.6), "max_tokens": 120}
+
+
+def test_reassign_picks_the_one_remaining_model_without_the_meta_router(monkeypatch):
+    router, _ = make_router(["a", "b"], monkeypatch)
+
+    assignment = reassign(router, "a")
+
+    assert assignment.model_name == "b"
+    assert assignment.parameters == {"temperature": pytest.approx(0.6), "max_tokens": 120}
+
+
+def test_reassign_trusts_a_confident_record_over_the_meta_router(monkeypatch):
+    router, _ = make_router(["a", "b", "c"], monkeypatch)
+    succeed(router, "c", router_module._CONFIDENT_SUCCESSES)
+
+    assert reassign(router, "a").model_name == "c"
+
+
+def test_reassign_asks_the_meta_router_below_the_confidence_bar(monkeypatch):
+    router, calls = make_router(["a", "b", "c"], monkeypatch, reply="I would pick c.")
+    succeed(router, "b", router_module._CONFIDENT_SUCCESSES - 1)
+
+    assignment = reassign(router, "a")
+
+    assert assignment.model_name == "c"
+    assert assignment.parameters == {"temperature": 0.5, "max_tokens": 100}
+    assert len(calls) == 1
+    assert "\n- b\n- c\n" in calls[0] and "- a\n" not in calls[0]
+
+
+def test_reassign_falls_back_to_the_best_ranked_model_when_the_meta_router_fails(monkeypatch):
+    router, calls = make_router(["a", "b", "c"], monkeypatch, reply=ConnectionError("ollama down"))
+    succeed(router, "c", 1)
+
+    assert reassign(router, "a").model_name == "c"
+    assert len(calls) == 1
+
+
+def test_success_counts_are_kept_per_task_type(monkeypatch):
+    router, _ = make_router(["a", "b", "c"], monkeypatch, reply=ConnectionError("ollama down"))
+    succeed(router, "c", router_module._CONFIDENT_SUCCESSES, task_type=TaskType.CODE)
+
+    assert reassign(router, "a", task_type=TaskType.OTHER).model_name == "b"
+
+
+def test_rank_models_orders_by_successes_and_keeps_input_order_for_ties(monkeypatch):
+    router, _ = make_router(["a", "b", "c", "d"], monkeypatch)
+    succeed(router, "c", 2)
+    succeed(router, "d", 1)
+    succeed(router, "a", 1, task_type=TaskType.CODE)
+
+    assert router.rank_models(TaskType.OTHER, ["a", "b", "c", "d"]) == ["c", "d", "a", "b"]
+    assert router.rank_models(TaskType.OTHER, ("b", "a")) == ["b", "a"]
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import sage.agents.evaluator as evaluator_module
+import sage.agents.executor as executor_module
+import sage.agents.router as router_module
+from sage import SAGE
+from sage.core.models import SAGEConfig, SubPrompt, TaskType
+from sage.core.utils import CallCancelled
+
+
+@pytest.fixture
+def fake_llms(monkeypatch):
+    """Replace the Ollama calls with sleeps that honour the cancel event and track concurrency."""
+    state = {"in_flight": 0, "peak": 0, "cancelled": [], "calls": 0}
+    lock = threading.Lock()
+    durations = {"fast_fail": 0.05, "winner": 0.05, "slow": 1.0}
+
+    def fake_execute(prompt, model="", cancel=None, base_url=None):
+        with lock:
+            state["in_flight"] += 1
+            state["calls"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            deadline = time.monotonic() + durations[model]
+            while time.monotonic() < deadline:
+                if cancel is not None and cancel.is_set():
+                    state["cancelled"].append(model)
+                    raise CallCancelled(model)
+                time.sleep(0.005)
+            return f"answer from {model}"
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+
+    def fake_evaluate(prompt, model="", cancel=None, base_url=None):
+        return "YES (0.9)" if "answer from winner" in prompt else "NO (0.1)"
+
+    monkeypatch.setattr(executor_module, "call_ollama", fake_execute)
+    monkeypatch.setattr(evaluator_module, "call_ollama", fake_evaluate)
+    monkeypatch.setattr(router_module, "call_ollama", lambda prompt, **kwargs: "fast_fail")
+    # Keep Evaluator() from loading (or downloading) the sentence-transformers model
+    monkeypatch.setattr(evaluator_module, "get_embedding_model", no_embedding_model)
+    return state
+
+
+def no_embedding_model(*args, **kwargs):
+    raise RuntimeError("embedding model disabled in tests")
+
+
+def make_sage(**overrides):
+    settings = dict(
+        available_models=["fast_fail", "winner", "slow"],
+        evaluator_model="judge",
+        verbose=False,
+        evaluator_cache=False,
+    )
+    settings.update(overrides)
+    config = SAGEConfig(**settings)
+    return SAGE(config_obj=config)
+
+
+def subprompt(id, dependencies=()):
+    return SubPrompt(id=id, content=id, task_type=TaskType.OTHER, expected_goal="", dependencies=list(dependencies))
+
+
+def test_speculative_retries_are_stopped_and_stay_within_max_concurrency(fake_llms):
+    sage = make_sage(max_concurrency=2, max_parallel_retries=2, max_retries=2)
+    # Dispatch the slow model alongside the winner so it has to be cancelled
+    sage.router.rank_models = lambda task_type, models: sorted(models, key=lambda m: m != "slow")
+
+    started = time.monotonic()
+    response = sage.process_prompt("Write a poem about the sea")
+
+    assert response.final_response == "answer from winner"
+    assert time.monotonic() - started < 0.8
+    assert fake_llms["peak"] <= 2
+    assert fake_llms["cancelled"] == ["slow"]
+
+
+def test_process_prompt_works_inside_a_running_event_loop(fake_llms):
+    sage = make_sage(available_models=["winner"])
+
+    async def host():
+        return sage.process_prompt("Write a poem about the sea")
+
+    assert asyncio.run(host()).final_response == "answer from winner"
+
+
+def test_execute_many_reports_each_result_as_it_completes(fake_llms):
+    sage = make_sage()
+    pairs = [(subprompt(model), sage.router.make_assignment(model)) for model in ("slow", "winner")]
+    seen = []
+
+    results = asyncio.run(sage.executor.execute_many(pairs, on_result=lambda i, result: seen.append((i, result.content))))
+
+    assert [r.content for r in results] == ["answer from slow", "answer from winner"]
+    assert seen == [(1, "answer from winner"), (0, "answer from slow")]
+
+
+def test_execute_many_reports_failed_executions_too(fake_llms):
+    sage = make_sage()
+    # The fake LLM has no timing for this model, so the call raises and the executor returns a failed result
+    pairs = [(subprompt("x"), sage.router.make_assignment("unknown-model"))]
+    seen = []
+
+    results = asyncio.run(sage.executor.execute_many(pairs, on_result=lambda i, result: seen.append((i, result.success))))
+
+    assert results[0].success is False
+    assert seen == [(0, False)]
+
+
+def test_rerunning_a_prompt_calls_the_model_again_by_default(fake_llms):
+    sage = make_sage(available_models=["winner"])
+
+    sage.process_prompt("Write a poem about the sea")
+    calls = fake_llms["calls"]
+    sage.process_prompt("Write a poem about the sea")
+
+    assert calls == 1
+    assert fake_llms["calls"] == 2
+
+
+def test_dependency_levels_group_independent_subprompts():
+    a, b, c, d = subprompt("a"), subprompt("b", ["outside"]), subprompt("c", ["a", "b"]), subprompt("d", ["c"])
+    levels = SAGE._dependency_levels([d, c, b, a])
+
+    assert [[sp.id for sp in level] for level in levels] == [["b", "a"], ["c"], ["d"]]
+
+
+def test_dependency_levels_reject_cycles():
+    with pytest.raises(ValueError, match="Cyclic"):
+        SAGE._dependency_levels([subprompt("x", ["y"]), subprompt("y", ["x"])])
@@ -0,0 +1,177 @@
+import json
+import threading
+
+import pytest
+
+import sage.core.utils as utils_module
+from sage.core.utils import (CallCancelled, call_gemini, call_ollama, configure_http_session,
+                             extract_model_name_from_response, stream_ollama)
+
+MODELS = ["gemma3:4b", "deepseek-r1:1.5b", "qwen3:1.7b"]
+
+
+def test_matches_case_insensitively_and_returns_the_configured_name():
+    assert extract_model_name_from_response("Use QWEN3:1.7B for this.", MODELS) == "qwen3:1.7b"
+
+
+def test_earliest_mention_wins():
+    assert extract_model_name_from_response("deepseek-r1:1.5b, not gemma3:4b", MODELS) == "deepseek-r1:1.5b"
+
+
+def test_longer_name_is_not_shadowed_by_its_prefix():
+    models = ["gemma3:4b", "gemma3:4b-it"]
+    assert extract_model_name_from_response("gemma3:4b-it", models) == "gemma3:4b-it"
+
+
+def test_accepts_lists_and_tuples():
+    assert extract_model_name_from_response("gemma3:4b", tuple(MODELS)) == "gemma3:4b"
+    assert extract_model_name_from_response("gemma3:4b", list(MODELS)) == "gemma3:4b"
+
+
+@pytest.mark.parametrize("models", [MODELS, []])
+def test_raises_when_no_model_is_named(models):
+    with pytest.raises(ValueError, match="No valid model name"):
+        extract_model_name_from_response("I am not sure.", models)
+
+
+class FakeResponse:
+    def __init__(self, lines, consumed):
+        self._lines = lines
+        self.consumed = consumed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for line in self._lines:
+            self.consumed.append(line)
+            yield line
+
+
+class FakeSession:
+    """Serves a canned Ollama stream; ``consumed`` records every line read from it."""
+
+    def __init__(self, *records):
+        self.lines = [r if isinstance(r, bytes) else json.dumps(r).encode() for r in records]
+        self.consumed = []
+        self.posts = []
+
+    def post(self, url, json=None, stream=False):
+        self.posts.append((url, json, stream))
+        return FakeResponse(self.lines, self.consumed)
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    def install(*records):
+        session = FakeSession(*records)
+        monkeypatch.setattr(utils_module, "_SESSION", session)
+        return session
+    return install
+
+
+def test_call_ollama_joins_and_strips_streamed_chunks(fake_session):
+    session = fake_session({"response": "  Hello"}, {"response": ", world"}, {"response": "!\n", "done": True})
+
+    assert call_ollama("hi", model="m", base_url="http://ollama") == "Hello, world!"
+    assert session.posts == [("http://ollama/api/generate", {"model": "m", "prompt": "hi", "stream": True}, True)]
+
+
+def test_stream_skips_blank_keep_alive_lines(fake_session):
+    fake_session(b"", {"response": "a"}, b"", {"response": "b", "done": True})
+
+    assert list(stream_ollama("hi")) == ["a", "b"]
+
+
+def test_stream_stops_reading_at_done(fake_session):
+    session = fake_session({"response": "a", "done": True}, {"response": "ignored"})
+
+    assert list(stream_ollama("hi")) == ["a"]
+    assert len(session.consumed) == 1
+
+
+def test_mid_stream_error_raises_runtime_error(fake_session):
+    fake_session({"response": "partial"}, {"error": "model crashed"})
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        call_ollama("hi")
+
+
+def test_set_cancel_raises_before_the_request(fake_session):
+    session = fake_session({"response": "a", "done": True})
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(CallCancelled):
+        call_ollama("hi", cancel=cancel)
+    assert session.posts == []
+
+
+def test_cancel_stops_the_stream_at_the_next_chunk(fake_session):
+    session = fake_session({"response": "a"}, {"response": "b"}, {"response": "c", "done": True})
+    cancel = threading.Event()
+    stream = stream_ollama("hi", cancel=cancel)
+
+    assert next(stream) == "a"
+    cancel.set()
+    with pytest.raises(CallCancelled):
+        next(stream)
+    assert len(session.consumed) == 2
+
+
+class ClosableSession:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_configure_http_session_only_rebuilds_to_grow_the_pool(monkeypatch):
+    current = ClosableSession()
+    monkeypatch.setattr(utils_module, "_SESSION", current)
+    monkeypatch.setattr(utils_module, "_SESSION_POOL_MAXSIZE", utils_module._DEFAULT_POOL_MAXSIZE)
+
+    # A SAGE with the default 4 + 2 concurrency fits the default pool
+    assert configure_http_session(6) is current
+    assert configure_http_session(utils_module._DEFAULT_POOL_MAXSIZE) is current
+    assert not current.closed
+
+    grown = configure_http_session(utils_module._DEFAULT_POOL_MAXSIZE + 1)
+    try:
+        assert grown is not current and utils_module._SESSION is grown
+        assert current.closed
+        assert grown.get_adapter("http://localhost").poolmanager.connection_pool_kw["maxsize"] == utils_module._DEFAULT_POOL_MAXSIZE + 1
+        assert configure_http_session(8) is grown
+    finally:
+        grown.close()
+
+
+def test_call_gemini_reads_the_api_key_at_call_time(monkeypatch):
+    used_keys = []
+
+    class FakeClient:
+        class models:
+            @staticmethod
+            def generate_content(model, contents):
+                return type("Response", (), {"text": " hi "})()
+
+    def fake_client(api_key):
+        used_keys.append(api_key)
+        return FakeClient
+
+    monkeypatch.setattr(utils_module, "_gemini_client", fake_client)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(ValueError, match="GEMINI_API_KEY"):
+        call_gemini("hello")
+
+    # Set after sage was imported, as a notebook or test would
+    monkeypatch.setenv("GEMINI_API_KEY", "late-key")
+    assert call_gemini("hello") == "hi"
+    assert call_gemini("hello", api_key="explicit") == "hi"
+    assert used_keys == ["late-key", "explicit"]